@@ -0,0 +1,197 @@
+import os
+import json
+import logging
+from concurrent.futures import wait, FIRST_COMPLETED
+from config import (
+    SIMILARITY_THRESHOLD,
+    MAX_MATCHES,
+    FAISS_MMAP,
+    MODEL_VERSION,
+    IMAGE_EXTENSIONS,
+    VIDEO_EXTENSIONS
+)
+
+def collect_inputs(source):
+    """
+    Expand a batch source into (path, is_video) pairs
+
+    Args:
+        source (str): Directory of images and videos (searched recursively), or a
+            manifest file with one path per line; relative manifest paths are
+            resolved against the manifest's directory and '#' starts a comment
+
+    Returns:
+        list: (path, is_video) pairs in a stable order
+    """
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names
+            if name.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS)
+        )
+    else:
+        manifest_dir = os.path.dirname(os.path.abspath(source))
+        with open(source) as f:
+            lines = [line.split('#', 1)[0].strip() for line in f]
+        paths = [os.path.join(manifest_dir, line) for line in lines if line]
+
+    return [(path, path.lower().endswith(VIDEO_EXTENSIONS)) for path in paths]
+
+def load_completed(report_path):
+    """
+    Inputs already recorded as processed in a report
+
+    A line torn by an interrupted run is truncated away so new entries start on
+    a clean line. Failed inputs are not counted, so a rerun retries them.
+    """
+    if not os.path.exists(report_path):
+        return set()
+
+    with open(report_path, "rb") as f:
+        data = f.read()
+
+    if data and not data.endswith(b"\n"):
+        logging.warning(f"Discarding incomplete last entry of {report_path}")
+        data = data[:data.rfind(b"\n") + 1]
+        with open(report_path, "r+b") as f:
+            f.truncate(len(data))
+
+    completed = set()
+    for line in data.decode("utf-8").splitlines():
+        if line.strip():
+            entry = json.loads(line)
+            if entry.get("status") == "ok":
+                completed.add(entry["input"])
+    return completed
+
+# Per-process pipeline and index for batch workers
+_worker_pipeline = None
+_worker_vector_store = None
+
+def _init_batch_worker():
+    """
+    Load models and the vector index once per worker process
+    """
+    global _worker_pipeline, _worker_vector_store
+
+    from pipeline import FacePipeline
+    from vector_store import get_vector_store
+
+    # Videos are handled whole by one worker; the pool already uses every core
+    _worker_pipeline = FacePipeline(video_workers=1).warm_up()
+    _worker_vector_store = get_vector_store(mmap=FAISS_MMAP)
+
+def _identify_input(task):
+    """
+    Detect, embed and search one image or video
+
+    Returns:
+        dict: Report entry for the input
+    """
+    input_path, is_video = task
+    entry = {
+        "input": input_path,
+        "type": "video" if is_video else "image",
+        "model_version": MODEL_VERSION
+    }
+
+    try:
+        records = _worker_pipeline.analyze(input_path, is_video)
+        matches = _search_records(records)
+    except Exception as e:
+        # One bad input is recorded and retried on the next run; it never aborts the batch
+        logging.error(f"Batch identification failed for {input_path}: {e}")
+        entry.update({"status": "error", "error": str(e)})
+        return entry
+
+    entry.update({"status": "ok", "faces": len(records), "matches": matches})
+    return entry
+
+def _search_records(records):
+    """
+    Search the worker's index for every embedded face of an input
+
+    Returns:
+        list: Match dicts above the similarity threshold
+    """
+    matches = []
+    for record in records:
+        if record["embedding"] is None:
+            continue
+
+        for similarity, embedding_id in _worker_vector_store.search_with_scores(record["embedding"], MAX_MATCHES):
+            if similarity <= SIMILARITY_THRESHOLD:
+                continue
+
+            match = {
+                "embedding_id": int(embedding_id),
+                "similarity": round(float(similarity), 4),
+                "bbox": [int(v) for v in record["bbox"]]
+            }
+            if "timestamp" in record:
+                match["timestamp"] = round(float(record["timestamp"]), 3)
+                match["frame_idx"] = int(record["frame_idx"])
+            matches.append(match)
+
+    return matches
+
+def identify_batch(source, report_path, workers=None):
+    """
+    Identify children in every input of a directory or manifest without prompting
+
+    Each processed input is appended to a JSONL report as soon as it finishes,
+    so an interrupted run resumes with the inputs it had not completed.
+    Confirmation of matches happens later, from the report.
+
+    Args:
+        source (str): Directory or manifest file of images and videos
+        report_path (str): JSONL report, created or appended to
+        workers (int, optional): Worker processes, defaults to the CPU count
+
+    Returns:
+        dict: Counts of inputs processed, skipped as already done, failed and matched
+    """
+    workers = workers or os.cpu_count() or 1
+    inputs = collect_inputs(source)
+    completed = load_completed(report_path)
+    pending = [task for task in inputs if task[0] not in completed]
+
+    summary = {"processed": 0, "skipped": len(inputs) - len(pending), "failed": 0, "with_matches": 0}
+    logging.info(f"Batch of {len(inputs)} inputs: {summary['skipped']} already in {report_path}, {len(pending)} to process")
+
+    if not pending:
+        return summary
+
+    workers = min(workers, len(pending))
+
+    report_dir = os.path.dirname(os.path.abspath(report_path))
+    os.makedirs(report_dir, exist_ok=True)
+
+    from workers import spawn_pool
+    with spawn_pool(workers, _init_batch_worker) as executor, open(report_path, "a") as report:
+        tasks = iter(pending)
+        in_flight = set()
+
+        while True:
+            # Keep a bounded number of inputs queued so finished entries are written promptly
+            for task in tasks:
+                in_flight.add(executor.submit(_identify_input, task))
+                if len(in_flight) >= 2 * workers:
+                    break
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                entry = future.result()
+                report.write(json.dumps(entry) + "\n")
+                report.flush()
+
+                summary["processed"] += 1
+                if entry["status"] != "ok":
+                    summary["failed"] += 1
+                elif entry["matches"]:
+                    summary["with_matches"] += 1
+
+    return summary
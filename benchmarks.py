@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import subprocess
+import logging
+import numpy as np
+from config import FAISS_INDEX_PATH, EMBEDDING_DIM
+
+def _time_call(func, repeats):
+    """
+    Run a function several times and return the median and last result
+    """
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)), result
+
+def bench_index_load(index_path=FAISS_INDEX_PATH, repeats=5):
+    """
+    Compare full in-RAM index loading against memory-mapped loading
+
+    Each mode reports the load time and the latency of the first query, since
+    memory-mapped pages are only faulted in when a search touches them.
+
+    Args:
+        index_path (str): Path to the FAISS index file
+        repeats (int): Number of measurements per mode
+
+    Returns:
+        dict: Median load and first-query times in milliseconds per mode
+    """
+    import faiss
+    from vector_store import MMAP_IO_FLAGS
+
+    query = np.random.default_rng(0).standard_normal((1, EMBEDDING_DIM)).astype(np.float32)
+    query /= np.linalg.norm(query)
+
+    modes = {
+        "read_index": lambda: faiss.read_index(index_path),
+        "mmap": lambda: faiss.read_index(index_path, MMAP_IO_FLAGS)
+    }
+
+    report = {}
+    for mode, load in modes.items():
+        load_time, index = _time_call(load, repeats)
+        search_time, _ = _time_call(lambda: index.search(query, 5), 1)
+        report[mode] = {
+            "load_ms": load_time * 1000,
+            "first_query_ms": search_time * 1000,
+            "vectors": int(index.ntotal)
+        }
+        logging.info(f"{mode}: {report[mode]}")
+
+    return report
+
+# Modules each CLI command imports before doing its work
+CLI_COMMAND_MODULES = {
+    "close": ["main", "vector_store"],
+    "register": ["main", "pipeline", "cache", "face_detection", "embeddings", "vector_store", "storage"],
+    "identify": ["main", "pipeline", "cache", "face_detection", "embeddings", "vector_store", "video_writer"],
+    "identify-batch": ["main", "batch"],
+    "stream": ["main", "stream", "face_detection", "embeddings", "vector_store"]
+}
+
+# Dependencies whose import dominates startup
+HEAVY_MODULES = ("torch", "ultralytics", "facenet_pytorch", "faiss", "cv2")
+
+def bench_cli_startup(commands=None, repeats=3):
+    """
+    Measure interpreter startup plus imports for each main.py command
+
+    Every measurement runs in a fresh interpreter so no import is already cached,
+    and reports which heavy dependencies the command ends up loading.
+
+    Args:
+        commands (list, optional): Commands to measure, defaults to all of them
+        repeats (int): Number of measurements per command
+
+    Returns:
+        dict: Median startup time in milliseconds and heavy modules loaded per command
+    """
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    baseline, _ = _time_call(lambda: subprocess.run([sys.executable, "-c", "pass"], check=True), repeats)
+
+    report = {}
+    for command in commands or CLI_COMMAND_MODULES:
+        code = (
+            f"import sys, {', '.join(CLI_COMMAND_MODULES[command])}; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        startup, result = _time_call(
+            lambda: subprocess.run([sys.executable, "-c", code], cwd=repo_dir, capture_output=True, text=True),
+            repeats
+        )
+        if result.returncode != 0:
+            logging.error(f"{command}: import failed\n{result.stderr}")
+            continue
+
+        report[command] = {
+            "startup_ms": startup * 1000,
+            "imports_ms": (startup - baseline) * 1000,
+            "heavy_modules": [m for m in result.stdout.strip().split(",") if m]
+        }
+        logging.info(f"{command}: {report[command]}")
+
+    return report
+
+if __name__ == "__main__":
+    # Usage: python benchmarks.py index-load [index_path]
+    #        python benchmarks.py startup [command...]
+    logging.basicConfig(level=logging.INFO)
+
+    if len(sys.argv) < 2:
+        print("Usage: python benchmarks.py [index-load/startup] [args...]")
+        sys.exit(1)
+
+    benchmark = sys.argv[1]
+
+    if benchmark == "index-load":
+        path = sys.argv[2] if len(sys.argv) > 2 else FAISS_INDEX_PATH
+        for mode, result in bench_index_load(path).items():
+            print(f"{mode:<12} load {result['load_ms']:8.2f} ms  "
+                  f"first query {result['first_query_ms']:8.2f} ms  "
+                  f"({result['vectors']} vectors)")
+    elif benchmark == "startup":
+        for command, result in bench_cli_startup(sys.argv[2:] or None).items():
+            print(f"{command:<10} startup {result['startup_ms']:8.1f} ms  "
+                  f"imports {result['imports_ms']:8.1f} ms  "
+                  f"heavy: {', '.join(result['heavy_modules']) or 'none'}")
+    else:
+        print(f"Unknown benchmark: {benchmark}")
+        sys.exit(1)
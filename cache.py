@@ -0,0 +1,194 @@
+import os
+import hashlib
+import logging
+import numpy as np
+from config import (
+    CACHE_DIR,
+    CACHE_MAX_BYTES,
+    EMBEDDING_DIM,
+    MODEL_VERSION,
+    INFERENCE_BACKEND,
+    ONNX_QUANTIZE,
+    QUALITY_GATING,
+    QUALITY_MIN_FACE_SIZE,
+    QUALITY_MIN_CONFIDENCE,
+    QUALITY_MIN_SHARPNESS,
+    QUALITY_MIN_BRIGHTNESS,
+    QUALITY_MAX_BRIGHTNESS,
+    VIDEO_ADAPTIVE_SAMPLING,
+    SAMPLER_BUDGET_FPS,
+    TILED_DETECTION,
+    TILE_MIN_FRAME_SIDE,
+    TILE_SIZE,
+    TILE_OVERLAP,
+    TILE_CANDIDATE_CONFIDENCE,
+    TILE_MAX_TILES,
+    TILE_ACTIVITY_SCALE,
+    TILE_MIN_ACTIVITY,
+    TILE_ACTIVITY_RATIO,
+    DETECTION_CONFIDENCE,
+    DETECTION_NMS_IOU
+)
+
+def content_hash(input_path, chunk_size=1024 * 1024):
+    """
+    SHA-256 of a file's contents, read in chunks so large videos stay cheap on memory
+    """
+    digest = hashlib.sha256()
+    with open(input_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DetectionCache:
+    def __init__(
+        self,
+        cache_dir=CACHE_DIR,
+        max_bytes=CACHE_MAX_BYTES,
+        model_version=MODEL_VERSION,
+        quality_gating=QUALITY_GATING
+    ):
+        """
+        Persistent cache of detected boxes and embeddings keyed by input content
+
+        Args:
+            cache_dir (str): Directory holding cache entries
+            max_bytes (int): Size bound enforced with least-recently-used eviction
+            model_version (str): Version string mixed into every key
+            quality_gating (bool): Whether the cached detections drop low-quality faces
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Backend, quantization, quality gating, frame sampling, detection thresholds and tiling change the results
+        quality_version = "q:off"
+        if quality_gating:
+            quality_version = (
+                f"q:{QUALITY_MIN_FACE_SIZE}/{QUALITY_MIN_CONFIDENCE}/{QUALITY_MIN_SHARPNESS}"
+                f"/{QUALITY_MIN_BRIGHTNESS}/{QUALITY_MAX_BRIGHTNESS}"
+            )
+        sampling_version = f"s:{SAMPLER_BUDGET_FPS}" if VIDEO_ADAPTIVE_SAMPLING else "s:1fps"
+        detection_version = f"d:{DETECTION_CONFIDENCE}"
+        tiling_version = "t:off"
+        if TILED_DETECTION:
+            tiling_version = (
+                f"t:{TILE_MIN_FRAME_SIDE}/{TILE_SIZE}/{TILE_OVERLAP}/{TILE_CANDIDATE_CONFIDENCE}/{TILE_MAX_TILES}"
+                f"/{TILE_ACTIVITY_SCALE}/{TILE_MIN_ACTIVITY}/{TILE_ACTIVITY_RATIO}/{DETECTION_NMS_IOU}"
+            )
+        self.model_version = (
+            f"{model_version}+{INFERENCE_BACKEND}{'-int8' if ONNX_QUANTIZE else ''}"
+            f"+{quality_version}+{sampling_version}+{detection_version}+{tiling_version}"
+        )
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, input_path):
+        """
+        Cache key for an input file under the current model version
+        """
+        return hashlib.sha256(f"{content_hash(input_path)}:{self.model_version}".encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Load cached detection records
+
+        Returns:
+            list or None: Records with 'bbox', 'confidence', 'quality', 'embedding'
+            and, for videos, 'frame_idx' and 'timestamp'; None on a miss
+        """
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as entry:
+                boxes = entry["boxes"]
+                confidences = entry["confidences"]
+                embeddings = entry["embeddings"]
+                frame_indices = entry["frame_indices"]
+                timestamps = entry["timestamps"]
+                # face_size, sharpness, brightness, score per face, plus the two flags
+                quality = entry["quality"]
+                truncated = entry["quality_truncated"]
+                passed = entry["quality_passed"]
+
+            # Touch the entry so eviction sees it as recently used
+            os.utime(path)
+        except Exception as e:
+            logging.warning(f"Discarding unreadable cache entry {path}: {e}")
+            os.remove(path)
+            return None
+
+        records = []
+        for i in range(len(boxes)):
+            record = {
+                "bbox": tuple(int(v) for v in boxes[i]),
+                "confidence": float(confidences[i]),
+                "quality": {
+                    "face_size": int(quality[i, 0]),
+                    "confidence": float(confidences[i]),
+                    "sharpness": float(quality[i, 1]),
+                    "brightness": float(quality[i, 2]),
+                    "truncated": bool(truncated[i]),
+                    "score": float(quality[i, 3]),
+                    "passed": bool(passed[i])
+                },
+                "embedding": embeddings[i]
+            }
+            if frame_indices[i] >= 0:
+                record["frame_idx"] = int(frame_indices[i])
+                record["timestamp"] = float(timestamps[i])
+            records.append(record)
+
+        logging.info(f"Cache hit for {key[:12]}: {len(records)} faces")
+        return records
+
+    def put(self, key, records):
+        """
+        Store detection records; records without an embedding are skipped
+        """
+        records = [r for r in records if r.get("embedding") is not None]
+        quality = [r["quality"] for r in records]
+
+        entry = {
+            "boxes": np.array([r["bbox"] for r in records], dtype=np.int32).reshape(-1, 4),
+            "confidences": np.array([r["confidence"] for r in records], dtype=np.float32),
+            "embeddings": np.array([r["embedding"] for r in records], dtype=np.float32).reshape(-1, EMBEDDING_DIM),
+            "frame_indices": np.array([r.get("frame_idx", -1) for r in records], dtype=np.int64),
+            "timestamps": np.array([r.get("timestamp", 0.0) for r in records], dtype=np.float64),
+            # Served with hits so callers see the same quality warnings warm or cold
+            "quality": np.array(
+                [[q["face_size"], q["sharpness"], q["brightness"], q["score"]] for q in quality], dtype=np.float64
+            ).reshape(-1, 4),
+            "quality_truncated": np.array([q["truncated"] for q in quality], dtype=bool),
+            "quality_passed": np.array([q["passed"] for q in quality], dtype=bool)
+        }
+
+        path = self._entry_path(key)
+        tmp_path = f"{path}.tmp.npz"
+        try:
+            np.savez(tmp_path, **entry)
+            os.replace(tmp_path, path)
+            self._evict()
+        except Exception as e:
+            logging.warning(f"Could not write cache entry {path}: {e}")
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache fits its size bound
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz") or name.endswith(".tmp.npz"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total_bytes -= size
+            logging.info(f"Evicted cache entry {name}")
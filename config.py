@@ -21,4 +21,102 @@ os.makedirs(IMAGE_STORAGE_PATH, exist_ok=True)
 # Additional configuration parameters
 EMBEDDING_DIM = 512  # Dimension of facial embeddings
 SIMILARITY_THRESHOLD = 0.7  # Default similarity threshold for face matching
-MAX_MATCHES = 5  # Maximum number of matches to return
\ No newline at end of file
+MAX_MATCHES = 5  # Maximum number of matches to return
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')  # Inputs treated as images
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov')  # Inputs treated as videos
+
+# Inference backend configuration
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "pytorch")  # 'pytorch' or 'onnx'
+ONNX_QUANTIZE = os.environ.get("ONNX_QUANTIZE", "0") == "1"  # Dynamic int8 quantization of exported models
+ONNX_OPSET = 17  # ONNX opset used when exporting models
+ONNX_PARITY_MIN_COSINE = 0.99  # Minimum cosine similarity between PyTorch and ONNX embeddings
+ONNX_DETECTOR_PARITY_IMAGE = os.environ.get("ONNX_DETECTOR_PARITY_IMAGE", os.path.join("weights", "parity_faces.jpg"))  # Photo with faces an exported detector must match PyTorch on
+ONNX_DETECTOR_PARITY_MIN_IOU = 0.9  # IoU each PyTorch box needs with an ONNX box for the detector to pass
+
+# CPU performance mode for PyTorch embedding inference
+TORCH_CPU_PERF_MODE = os.environ.get("TORCH_CPU_PERF_MODE", "0") == "1"
+TORCH_INTRA_OP_THREADS = int(os.environ.get("TORCH_INTRA_OP_THREADS", "0"))  # 0 keeps the PyTorch default
+TORCH_INTER_OP_THREADS = int(os.environ.get("TORCH_INTER_OP_THREADS", "0"))  # 0 keeps the PyTorch default
+TORCH_BF16_AUTOCAST = os.environ.get("TORCH_BF16_AUTOCAST", "0") == "1"
+TORCH_COMPILE = os.environ.get("TORCH_COMPILE", "0") == "1"
+TORCH_WARMUP_BATCH = 4  # Dummy batch size used to warm up the model at load time
+TORCH_REPORT_SPEEDUP = os.environ.get("TORCH_REPORT_SPEEDUP", "0") == "1"
+
+# Face preprocessing configuration
+FACE_SIZE = 160  # Input size of the embedding model
+FACE_BATCH_SIZE = 32  # Initial capacity of the preallocated face batch buffer
+# Convert BGR crops to RGB before embedding, as the model was trained. Off by default because
+# existing galleries were embedded from BGR crops; enable it together with running migrate.py
+FACE_INPUT_RGB = os.environ.get("FACE_INPUT_RGB", "0") == "1"
+
+# Video processing configuration
+VIDEO_WORKERS = int(os.environ.get("VIDEO_WORKERS", "1"))  # Processes used to shard a video (1 disables sharding)
+VIDEO_SEGMENT_SECONDS = 30  # Fixed segment length handed to each worker task
+
+# Vector index sharding configuration
+FAISS_NUM_SHARDS = int(os.environ.get("FAISS_NUM_SHARDS", "1"))  # 1 keeps a single index file
+FAISS_SHARD_STRATEGY = os.environ.get("FAISS_SHARD_STRATEGY", "id")  # 'id' (hash of embedding ID) or 'region' (last_known_location)
+FAISS_MMAP = os.environ.get("FAISS_MMAP", "0") == "1"  # Memory-map indexes opened for search
+
+# Embedding journal configuration
+JOURNAL_SNAPSHOT_INTERVAL = int(os.environ.get("JOURNAL_SNAPSHOT_INTERVAL", "1000"))  # Mutations between compacted snapshots
+JOURNAL_FSYNC = os.environ.get("JOURNAL_FSYNC", "1") == "1"  # fsync each journal record for crash durability
+
+# Detection and embedding cache configuration
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "1") == "1"
+CACHE_DIR = os.path.join(BASE_DIR, "data", "cache")
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # LRU eviction above this size
+EMBEDDING_MODEL_TYPE = "vggface2"  # Pretrained weights of the embedding model
+DETECTOR_MODEL_NAME = "yolov8n-face"  # Face detection weights
+# Identifies the models and preprocessing that produced cached results and stored embeddings
+MODEL_VERSION = f"{DETECTOR_MODEL_NAME}+{EMBEDDING_MODEL_TYPE}+{'rgb' if FACE_INPUT_RGB else 'bgr'}"
+# Version assumed for indexes without a metadata sidecar, all built from BGR crops
+LEGACY_MODEL_VERSION = "yolov8n-face+vggface2+bgr"
+
+# Face quality gating configuration
+QUALITY_GATING = os.environ.get("QUALITY_GATING", "1") == "1"  # Drop low-quality crops before embedding
+QUALITY_MIN_FACE_SIZE = 24  # Minimum box side in pixels
+QUALITY_MIN_CONFIDENCE = 0.5  # Minimum detector confidence
+QUALITY_MIN_SHARPNESS = 30.0  # Minimum Laplacian variance of the 160x160 grayscale crop
+QUALITY_MIN_BRIGHTNESS = 40.0  # Minimum mean grayscale intensity
+QUALITY_MAX_BRIGHTNESS = 220.0  # Maximum mean grayscale intensity
+QUALITY_EDGE_MARGIN = 2  # Boxes within this many pixels of the frame edge count as truncated
+
+# Multi-photo gallery configuration
+GALLERY_MODE = os.environ.get("GALLERY_MODE", "template")  # 'template' (mean embedding) or 'set' (representative embeddings)
+GALLERY_MAX_EMBEDDINGS = 5  # Maximum embeddings stored per child in 'set' mode
+
+# Adaptive video frame sampling configuration
+VIDEO_ADAPTIVE_SAMPLING = os.environ.get("VIDEO_ADAPTIVE_SAMPLING", "1") == "1"  # False keeps one frame per second
+SAMPLER_BUDGET_FPS = float(os.environ.get("SAMPLER_BUDGET_FPS", "2.0"))  # Maximum detector calls per second of video
+SAMPLER_MIN_FPS = 0.5  # Frames sampled per second even in a static scene
+SAMPLER_PROBE_FPS = 10.0  # Rate at which frames are decoded and checked for change
+SAMPLER_MOTION_THRESHOLD = 4.0  # Mean absolute grayscale difference that counts as motion
+SAMPLER_SCENE_THRESHOLD = 0.7  # Histogram correlation below which a scene change is declared
+
+# Live stream identification configuration
+STREAM_MAX_LATENCY = 1.0  # Seconds; frames older than this when processing starts are skipped
+STREAM_MATCH_COOLDOWN = 10.0  # Seconds before the same child is reported again
+STREAM_METRICS_INTERVAL = 10.0  # Seconds between metrics log lines
+
+# Annotated output video configuration
+VIDEO_WRITER_QUEUE_SIZE = 64  # Frames buffered for the encoder thread
+VIDEO_OUTPUT_SEGMENTS_ONLY = os.environ.get("VIDEO_OUTPUT_SEGMENTS_ONLY", "0") == "1"  # Only write footage around matches
+VIDEO_SEGMENT_PRE_ROLL = 1.0  # Seconds written before a match in segments-only mode
+VIDEO_SEGMENT_POST_ROLL = 2.0  # Seconds written after a match in segments-only mode
+VIDEO_ANNOTATION_HOLD = 1.0  # Seconds a detection stays drawn after the frame it was found on
+TRACKER_MIN_IOU = 0.3  # Minimum IoU to continue a track between sampled frames
+TRACKER_MAX_AGE = 3  # Sampled frames a track survives without a matching detection
+
+# Tiled detection for high-resolution frames
+TILED_DETECTION = os.environ.get("TILED_DETECTION", "0") == "1"  # Re-detect active regions at native resolution
+TILE_MIN_FRAME_SIDE = 1920  # Frames whose longer side is below this use the single full-frame pass
+TILE_SIZE = 640  # Native-resolution tile side, matching the detector input size
+TILE_OVERLAP = 0.25  # Fraction of a tile shared with its grid neighbours, so faces on a seam are whole in one tile
+TILE_CANDIDATE_CONFIDENCE = 0.05  # Coarse-pass confidence that gives a tile priority over motion and texture
+TILE_MAX_TILES = 16  # Tiles per frame: candidate tiles first, then the most active
+TILE_ACTIVITY_SCALE = 4  # Downscale factor for the motion and texture maps that rank tiles
+TILE_MIN_ACTIVITY = 2.0  # Mean grey-level motion or texture below which a tile is never re-detected
+TILE_ACTIVITY_RATIO = 1.5  # A tile without candidates runs only if this many times the frame's median tile activity
+DETECTION_CONFIDENCE = 0.25  # Confidence kept from the coarse pass and the tiles
+DETECTION_NMS_IOU = 0.5  # IoU above which boxes from overlapping tiles are merged
@@ -2,9 +2,7 @@ import mysql.connector
 from config import MYSQL_CONFIG
 import logging
 import os
-from config import FAISS_INDEX_PATH, IMAGE_STORAGE_PATH
-import faiss
-import numpy as np
+from config import IMAGE_STORAGE_PATH
 
 def create_connection():
     """
@@ -213,19 +211,20 @@ def update_case_status(embedding_id, status='Closed'):
         
         # If status is Closed, clean up associated data
         if status == 'Closed':
-            # Remove from FAISS index
-            try:
-                index = faiss.read_index(FAISS_INDEX_PATH)
-                # Remove the embedding from the index
-                index.remove_ids(np.array([embedding_id], dtype=np.int64))
-                faiss.write_index(index, FAISS_INDEX_PATH)
-                logging.info(f"Removed embedding {embedding_id} from FAISS index")
-            except Exception as e:
-                logging.error(f"Error removing embedding from FAISS: {e}")
+            # Remove from FAISS index (imported here: vector_store is the heavier module)
+            from vector_store import remove_embedding_from_faiss
+            if not remove_embedding_from_faiss(embedding_id, child_details.get('last_known_location')):
+                logging.error(f"Error removing embedding {embedding_id} from FAISS")
             
-            # Remove encrypted image
-            encrypted_image_path = child_details['image_url']
-            if encrypted_image_path and os.path.exists(encrypted_image_path):
+            # Remove encrypted images (primary photo plus any extra gallery photos)
+            from storage import gallery_image_paths
+            gallery_paths = gallery_image_paths(embedding_id)
+            if child_details['image_url'] and child_details['image_url'] not in gallery_paths:
+                gallery_paths.insert(0, child_details['image_url'])
+            
+            for encrypted_image_path in gallery_paths:
+                if not os.path.exists(encrypted_image_path):
+                    continue
                 try:
                     # Secure deletion method
                     def secure_delete(file_path, passes=3):
@@ -281,6 +280,34 @@ def search_open_cases():
     finally:
         conn.close()
 
+def get_children_by_status(statuses=('Open', 'Resolved')):
+    """
+    Retrieve children whose case status is one of the given statuses
+    
+    Args:
+        statuses (tuple): Case statuses to include
+    
+    Returns:
+        list: List of child details, or None if the database could not be queried
+    """
+    conn = create_connection()
+    if not conn:
+        logging.error("Database connection failed")
+        return None
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        placeholders = ", ".join(["%s"] * len(statuses))
+        query = f"SELECT * FROM Children_Metadata WHERE case_status IN ({placeholders})"
+        cursor.execute(query, tuple(statuses))
+        return cursor.fetchall()
+    
+    except mysql.connector.Error as e:
+        logging.error(f"Children Retrieval Error: {e}")
+        return None
+    finally:
+        conn.close()
+
 # Initialize database setup function
 def initialize_database():
     """
@@ -51,13 +51,15 @@ class ImageEncryptor:
             f.write(tag)
             f.write(ciphertext)
 
-    def decrypt_image(self, input_path, output_path):
+    def decrypt_image_bytes(self, input_path):
         """
-        Decrypt an encrypted image file
+        Decrypt an encrypted image file into memory
         
         Args:
             input_path (str): Encrypted image path
-            output_path (str): Decrypted image path
+        
+        Returns:
+            bytes: Decrypted image data
         """
         with open(input_path, 'rb') as f:
             nonce = f.read(16)
@@ -65,7 +67,17 @@ class ImageEncryptor:
             ciphertext = f.read()
         
         cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
-        data = cipher.decrypt_and_verify(ciphertext, tag)
+        return cipher.decrypt_and_verify(ciphertext, tag)
+
+    def decrypt_image(self, input_path, output_path):
+        """
+        Decrypt an encrypted image file
+        
+        Args:
+            input_path (str): Encrypted image path
+            output_path (str): Decrypted image path
+        """
+        data = self.decrypt_image_bytes(input_path)
         
         with open(output_path, 'wb') as f:
             f.write(data)
@@ -82,6 +94,19 @@ def encrypt_image(input_path, output_path):
     encryptor = ImageEncryptor()
     encryptor.encrypt_image(input_path, output_path)
 
+def decrypt_image_bytes(input_path):
+    """
+    Convenience function to decrypt image into memory
+    
+    Args:
+        input_path (str): Encrypted image path
+    
+    Returns:
+        bytes: Decrypted image data
+    """
+    encryptor = ImageEncryptor()
+    return encryptor.decrypt_image_bytes(input_path)
+
 def decrypt_image(input_path, output_path):
     """
     Convenience function to decrypt image
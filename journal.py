@@ -0,0 +1,188 @@
+import os
+import struct
+import zlib
+import logging
+from contextlib import contextmanager
+import numpy as np
+from config import JOURNAL_FSYNC
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+OP_ADD = 1
+OP_REMOVE = 2
+
+# Record header: operation, embedding ID, payload length, CRC32 of the payload
+_HEADER = struct.Struct("<BqII")
+
+def _lock_exclusive(f):
+    """
+    Block until an exclusive lock on an open file is held
+    """
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after about 10 seconds; keep waiting
+            continue
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class EmbeddingJournal:
+    def __init__(self, path, embedding_dim=512, fsync=JOURNAL_FSYNC):
+        """
+        Append-only write-ahead journal of vector store mutations
+
+        Args:
+            path (str): Journal file path
+            embedding_dim (int): Embedding dimension of ADD records
+            fsync (bool): Flush each record to disk before returning
+        """
+        self.path = path
+        self.embedding_dim = embedding_dim
+        self.fsync = fsync
+        self._file = None
+        self._lock_file = None
+        self._lock_depth = 0
+
+    @contextmanager
+    def lock(self):
+        """
+        Hold the exclusive lock shared by every process using this journal
+
+        Appends, snapshots and loads happen under this lock, so no process reads a
+        snapshot and journal that another process is halfway through replacing.
+        Re-entrant within one store.
+        """
+        if self._lock_depth == 0:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._lock_file = open(f"{self.path}.lock", "a+b")
+            _lock_exclusive(self._lock_file)
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0:
+                _unlock(self._lock_file)
+                self._lock_file.close()
+                self._lock_file = None
+
+    def _append(self, op, embedding_id, payload=b""):
+        """
+        Write a single record with one write call
+
+        Returns:
+            int: Journal size after the record, with the lock held the offset up to
+            which this process has applied the journal
+        """
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "ab")
+
+        header = _HEADER.pack(op, int(embedding_id), len(payload), zlib.crc32(payload))
+        self._file.write(header + payload)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        return os.fstat(self._file.fileno()).st_size
+
+    def append_add(self, embedding_id, embedding):
+        """
+        Record an added embedding (ID plus float32 vector)
+        """
+        vector = np.ascontiguousarray(embedding, dtype="<f4").reshape(-1)
+        return self._append(OP_ADD, embedding_id, vector.tobytes())
+
+    def append_remove(self, embedding_id):
+        """
+        Record a removed embedding ID
+        """
+        return self._append(OP_REMOVE, embedding_id)
+
+    def replay(self, offset=0):
+        """
+        Read back the complete records from a byte offset, in order
+
+        Reading never modifies the file. A torn or corrupt record (a crash
+        mid-append) ends the replay; the returned offset stops before it so the
+        writer can cut it off with truncate().
+
+        Args:
+            offset (int): Byte offset to start from, the end of records already applied
+
+        Returns:
+            tuple: (list of (op, embedding_id, vector or None), offset after the last complete record)
+        """
+        if not os.path.exists(self.path):
+            return [], 0
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+
+        records = []
+        position = 0
+        while position + _HEADER.size <= len(data):
+            op, embedding_id, length, checksum = _HEADER.unpack_from(data, position)
+            payload = data[position + _HEADER.size:position + _HEADER.size + length]
+
+            if len(payload) != length or zlib.crc32(payload) != checksum or op not in (OP_ADD, OP_REMOVE):
+                break
+
+            vector = None
+            if op == OP_ADD:
+                vector = np.frombuffer(payload, dtype="<f4").astype(np.float32)
+                if vector.size != self.embedding_dim:
+                    break
+
+            records.append((op, embedding_id, vector))
+            position += _HEADER.size + length
+
+        return records, offset + position
+
+    def size(self):
+        """
+        Current journal size in bytes
+        """
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def truncate(self, offset):
+        """
+        Cut off a torn tail; only call with the lock held, when no append can be in flight
+        """
+        tail = self.size() - offset
+        if tail > 0:
+            logging.warning(f"Discarding {tail} bytes of incomplete journal tail in {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+
+    def reset(self):
+        """
+        Empty the journal once its records are captured in a snapshot
+        """
+        self.close()
+        with open(self.path, "wb"):
+            pass
+
+    def close(self):
+        """
+        Close the append handle
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
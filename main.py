@@ -1,71 +1,124 @@
 import sys
 import os
-from face_detection import detect_faces
-from embeddings import extract_embedding
-from vector_store import add_embedding_to_faiss, search_faiss
 from database import (
     insert_child_metadata, 
     create_metadata_table, 
     get_child_by_embedding_id,
     update_case_status
 )
-from storage import store_encrypted_image
-import numpy as np
+from config import (
+    GALLERY_MODE,
+    GALLERY_MAX_EMBEDDINGS,
+    VIDEO_OUTPUT_SEGMENTS_ONLY,
+    FAISS_MMAP,
+    IMAGE_EXTENSIONS,
+    VIDEO_EXTENSIONS
+)
 import logging
 
+# Model, index and storage modules (torch, ultralytics, faiss) are imported by the
+# commands that use them, so 'close' and lookups start without loading them
+
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
-def register_lost_child(image_url, name, age, gender, guardian_contact):
+def expand_image_paths(image_arg):
+    """
+    Expand a registration image argument into photo paths
+    
+    Args:
+        image_arg (str): A single image, comma-separated images, or a directory of images
+    
+    Returns:
+        list: Image paths
+    """
+    if os.path.isdir(image_arg):
+        return sorted(
+            os.path.join(image_arg, name)
+            for name in os.listdir(image_arg)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+    return [path.strip() for path in image_arg.split(',') if path.strip()]
+
+def register_lost_child(image_url, name, age, gender, guardian_contact, last_known_location=None):
     """
     Register a lost child with comprehensive logging and error handling
     
     Args:
-        image_url (str): Path to child's image
+        image_url (str): Path to child's image, comma-separated images, or a directory of images
         name (str): Child's name
         age (int): Child's age
         gender (str): Child's gender
         guardian_contact (str): Guardian's contact info
+        last_known_location (str, optional): Where the child was last seen; also routes
+            the gallery to its shard when FAISS_SHARD_STRATEGY is 'region'
     """
+    from pipeline import FacePipeline
+    
     logging.info(f"Registering lost child: {name}")
     
-    # Detect faces
-    faces = detect_faces(image_url)
+    # Registration photos are ranked by quality but never rejected by the gate
+    pipeline = FacePipeline(quality_gating=False)
+    photos = []
+    embeddings = []
     
-    if not faces:
+    for photo in expand_image_paths(image_url):
+        # Detect faces and extract embeddings (served from cache for known photos)
+        records = pipeline.analyze(photo)
+        
+        # Use the best quality detected face
+        if not records or records[0]["embedding"] is None:
+            logging.warning(f"No usable face in {photo}")
+            continue
+        
+        quality = records[0].get("quality")
+        if quality and not quality["passed"]:
+            logging.warning(f"Low quality face in {photo}: {quality}")
+            print(f"Warning: the face in {photo} is small, blurry, badly lit or uncertain; a clearer photo will match better.")
+        
+        photos.append(photo)
+        embeddings.append(records[0]["embedding"])
+    
+    if not embeddings:
         logging.error("No face detected in the image")
         print("No face detected.")
         return
     
-    # Use the first detected face
-    face = faces[0]
+    import numpy as np
+    from embeddings import aggregate_template, select_representatives
+    from vector_store import add_gallery_to_faiss
+    from storage import store_encrypted_image
     
-    # Extract embedding
-    embedding = extract_embedding(face)
+    # Aggregate the photos into one template, or keep a capped representative set
+    template = aggregate_template(embeddings)
+    if GALLERY_MODE == 'set':
+        gallery = select_representatives(embeddings, GALLERY_MAX_EMBEDDINGS)
+    else:
+        gallery = [template]
     
-    if embedding is None:
-        logging.error("Failed to extract embedding")
-        print("Failed to extract facial embedding.")
-        return
+    logging.info(f"Using {len(gallery)} gallery embeddings from {len(photos)} photos")
     
     # Generate unique embedding ID (use hash for consistency)
-    embedding_id = hash(name + str(age) + str(np.mean(embedding))) % 1000000
+    embedding_id = hash(name + str(age) + str(np.mean(template))) % 1000000
     
     logging.info(f"Generated Embedding ID: {embedding_id}")
     
-    # Add embedding to vector store
-    if not add_embedding_to_faiss(embedding, embedding_id):
+    # Add embeddings to vector store
+    if not add_gallery_to_faiss(gallery, embedding_id, region=last_known_location):
         logging.error("Failed to add embedding to vector store")
         print("Error adding embedding to database.")
         return
     
-    # Store encrypted image
+    # Store encrypted images; extra photos are kept for later re-embedding
     try:
-        encrypted_image_path = store_encrypted_image(image_url, embedding_id)
+        encrypted_image_path = store_encrypted_image(photos[0], embedding_id)
+        for k, photo in enumerate(photos[1:], 1):
+            store_encrypted_image(photo, f"{embedding_id}_{k}")
         
         # Insert metadata
         metadata_id = insert_child_metadata(
             name, age, gender, guardian_contact, 
-            embedding_id, encrypted_image_path
+            embedding_id, encrypted_image_path,
+            last_known_location=last_known_location
         )
         
         if metadata_id:
@@ -105,38 +158,49 @@ def identify_found_child(input_path, is_video=False, output_video_path=None):
     Args:
         input_path (str): Path to image or video
         is_video (bool): Whether input is a video
-        output_video_path (str, optional): Path to save output video
+        output_video_path (str, optional): Path to save an annotated copy of the video,
+            rendered in a second pass once the matches have been reported
     """
+    from pipeline import FacePipeline
+    from vector_store import get_vector_store
+    
     logging.info(f"Identifying child from image: {input_path}")
     
-    # Detect faces
-    faces = detect_faces(input_path, is_video, output_video_path)
+    # Detect faces and extract embeddings (served from cache for re-submitted evidence)
+    records = FacePipeline().analyze(input_path, is_video)
     
-    if not faces:
+    if not records:
         logging.warning("No faces detected in the input")
         print("No faces detected.")
         return
     
-    # Unique matches tracking
+    # Load the index once for every face in the input
+    vector_store = get_vector_store(mmap=FAISS_MMAP)
+    
+    # Unique matches tracking, with the first timestamp each match was seen at
     unique_matches = set()
+    first_seen = {}
     
     # Process each detected face
-    for i, face in enumerate(faces, 1):
-        logging.info(f"Processing face {i}/{len(faces)}")
+    for i, record in enumerate(records, 1):
+        logging.info(f"Processing face {i}/{len(records)}")
         
-        # Extract embedding
-        embedding = extract_embedding(face)
+        embedding = record["embedding"]
         
         if embedding is None:
             logging.warning(f"Failed to extract embedding for face {i}")
             continue
         
         # Search for matches
-        matches = search_faiss(embedding, top_k=5, similarity_threshold=0.7)
+        matches = vector_store.search_embeddings(embedding, top_k=5, similarity_threshold=0.7)
         
         if matches[0] != -1:
             # Add matches to the unique set
+            record["matches"] = [int(match) for match in matches]
             unique_matches.update(matches)
+            if "timestamp" in record:
+                for match in matches:
+                    first_seen.setdefault(int(match), record["timestamp"])
     
     if unique_matches:
         print("Potential matches found!")
@@ -165,6 +229,8 @@ def identify_found_child(input_path, is_video=False, output_video_path=None):
                     print(f"Gender: {child_details['gender']}")
                     print(f"Guardian Contact: {child_details['guardian_contact']}")
                     print(f"Case Status: {child_details['case_status']}")
+                    if embedding_id in first_seen:
+                        print(f"First Seen At: {first_seen[embedding_id]:.1f}s")
                     
                     # Prompt to close the case
                     close_case = input("Is this the correct child? Do you want to close this case? (yes/no): ").lower()
@@ -178,6 +244,72 @@ def identify_found_child(input_path, is_video=False, output_video_path=None):
     else:
         logging.info("No matches found in the entire process")
         print("No matches found.")
+    
+    if is_video and output_video_path:
+        # Boxes, track IDs and matched children; a failed output file never hides the matches above
+        from video_writer import render_annotated_video
+        if render_annotated_video(input_path, output_video_path, records, segments_only=VIDEO_OUTPUT_SEGMENTS_ONLY):
+            print(f"Annotated video saved to {output_video_path}")
+        else:
+            print(f"Could not write annotated video to {output_video_path}; see log for details")
+
+def identify_batch(source, report_path=None, workers=None):
+    """
+    Identify children across a directory or manifest of images and videos, unattended
+    
+    Args:
+        source (str): Directory of inputs, or a manifest file with one path per line
+        report_path (str, optional): JSONL match report, defaults to <source>_matches.jsonl
+        workers (int, optional): Worker processes, defaults to the CPU count
+    """
+    from batch import identify_batch as run_batch
+    
+    if report_path is None:
+        report_path = f"{os.path.splitext(source.rstrip(os.sep))[0]}_matches.jsonl"
+    
+    logging.info(f"Starting batch identification: {source}")
+    summary = run_batch(source, report_path, workers)
+    
+    print(
+        f"Processed: {summary['processed']}, already done: {summary['skipped']}, "
+        f"failed: {summary['failed']}, with matches: {summary['with_matches']}"
+    )
+    print(f"Match report: {report_path}")
+
+def identify_from_stream(source, realtime=False, output_video_path=None):
+    """
+    Identify children continuously from a live camera, RTSP stream or paced video file
+    
+    Args:
+        source (str): Device index, stream URL or video path
+        realtime (bool): Play files back at their native frame rate
+        output_video_path (str, optional): Path to save annotated processed frames
+    """
+    from stream import StreamIdentifier, parse_source
+    
+    logging.info(f"Starting stream identification: {source}")
+    child_cache = {}
+    
+    def report_match(event):
+        embedding_id = event["embedding_id"]
+        if embedding_id not in child_cache:
+            child_cache[embedding_id] = get_child_by_embedding_id(embedding_id)
+        child_details = child_cache[embedding_id]
+        
+        name = child_details['name'] if child_details else "Unknown"
+        print(
+            f"Match: {name} (Embedding ID: {embedding_id}), "
+            f"Similarity: {event['similarity']:.3f}, Frame: {event['frame_idx']}, "
+            f"BBox: {event['bbox']}, Latency: {event['latency'] * 1000:.0f} ms"
+        )
+    
+    identifier = StreamIdentifier(parse_source(source), realtime=realtime, output_path=output_video_path)
+    metrics = identifier.run(report_match)
+    
+    print(
+        f"Frames read: {metrics['frames_read']}, processed: {metrics['frames_processed']}, "
+        f"dropped: {metrics['frames_dropped'] + metrics['frames_stale']}, matches: {metrics['matches']}"
+    )
 
 def main():
     """
@@ -195,7 +327,7 @@ def main():
     
     if len(sys.argv) < 3:
         logging.error("Insufficient arguments")
-        print("Usage: python main.py [register/identify/close] [args...]")
+        print("Usage: python main.py [register/identify/identify-batch/stream/close] [args...]")
         sys.exit(1)
     
     action = sys.argv[1]
@@ -203,26 +335,48 @@ def main():
     
     try:
         if action == "register":
-            # Expect: python main.py register image_path name age gender guardian_contact
-            if len(sys.argv) != 7:
+            # Expect: python main.py register image_path[,image_path...|image_dir] name age gender guardian_contact [last_known_location]
+            if len(sys.argv) not in (7, 8):
                 logging.error("Incorrect arguments for registration")
-                print("Register requires: name, age, gender, guardian_contact")
+                print("Register requires: name, age, gender, guardian_contact [last_known_location]")
                 sys.exit(1)
             
             name, age, gender, guardian_contact = sys.argv[3:7]
-            register_lost_child(input_path, name, int(age), gender, guardian_contact)
+            last_known_location = sys.argv[7] if len(sys.argv) == 8 else None
+            register_lost_child(input_path, name, int(age), gender, guardian_contact, last_known_location)
         
         elif action == "identify":
+            # Expect: python main.py identify input_path [--no-video]
             # Check if input is a video
-            is_video = input_path.lower().endswith(('.mp4', '.avi', '.mov'))
+            is_video = input_path.lower().endswith(VIDEO_EXTENSIONS)
             output_video_path = None
             
-            if is_video:
-                # Optional: generate output video with detections
-                output_video_path = input_path.replace('.', '_detected.')
+            if is_video and "--no-video" not in sys.argv[3:]:
+                # Generate output video with detections
+                root, ext = os.path.splitext(input_path)
+                output_video_path = f"{root}_detected{ext}"
             
             identify_found_child(input_path, is_video, output_video_path)
         
+        elif action == "identify-batch":
+            # Expect: python main.py identify-batch input_dir|manifest [--report path] [--workers n]
+            options = sys.argv[3:]
+            report_path = None
+            workers = None
+            if "--report" in options and options.index("--report") + 1 < len(options):
+                report_path = options[options.index("--report") + 1]
+            if "--workers" in options and options.index("--workers") + 1 < len(options):
+                workers = int(options[options.index("--workers") + 1])
+            identify_batch(input_path, report_path, workers)
+        
+        elif action == "stream":
+            # Expect: python main.py stream source [--realtime] [--output path]
+            options = sys.argv[3:]
+            output_video_path = None
+            if "--output" in options and options.index("--output") + 1 < len(options):
+                output_video_path = options[options.index("--output") + 1]
+            identify_from_stream(input_path, realtime="--realtime" in options, output_video_path=output_video_path)
+        
         elif action == "close":
             # New action to close a specific case
             if len(sys.argv) != 3:
@@ -235,7 +389,7 @@ def main():
         
         else:
             logging.error("Invalid action specified")
-            print("Invalid action. Use 'register', 'identify', or 'close'")
+            print("Invalid action. Use 'register', 'identify', 'identify-batch', 'stream', or 'close'")
             sys.exit(1)
     
     except Exception as e:
@@ -0,0 +1,355 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+from contextlib import ExitStack
+import cv2
+import numpy as np
+from config import (
+    FAISS_INDEX_PATH,
+    FAISS_NUM_SHARDS,
+    EMBEDDING_DIM,
+    MODEL_VERSION,
+    LEGACY_MODEL_VERSION,
+    GALLERY_MODE,
+    GALLERY_MAX_EMBEDDINGS
+)
+from vector_store import (
+    VectorStore,
+    ShardedVectorStore,
+    shard_path,
+    gallery_vector_ids,
+    read_index_metadata,
+    write_index_metadata
+)
+from database import get_children_by_status
+from storage import gallery_image_paths
+from workers import spawn_pool
+
+# Children handed to a worker per task
+MIGRATION_BATCH_SIZE = 8
+
+# Seconds to wait for a registration caught mid-flight at switch-over, and how
+# many times to retry before ignoring index entries that never reach the database
+MIGRATION_SWITCH_RETRY_SECONDS = 1.0
+MIGRATION_SWITCH_RETRIES = 30
+
+def versioned_index_path(model_version, base_path=FAISS_INDEX_PATH):
+    """
+    Index path for a model version, e.g. faiss_index.yolov8n-face+vggface2+rgb.bin
+    """
+    root, ext = os.path.splitext(base_path)
+    safe_version = re.sub(r"[^A-Za-z0-9_.+-]", "_", model_version)
+    return f"{root}.{safe_version}{ext}"
+
+def _index_files(base_path):
+    """
+    Index files making up a store: the file itself, or one file per shard
+    """
+    if FAISS_NUM_SHARDS > 1:
+        return [shard_path(base_path, shard) for shard in range(FAISS_NUM_SHARDS)]
+    return [base_path]
+
+def _open_store(base_path, model_version=MODEL_VERSION):
+    """
+    Open the configured store type at a given base path
+    """
+    if FAISS_NUM_SHARDS > 1:
+        return ShardedVectorStore(base_path=base_path, model_version=model_version)
+    return VectorStore(EMBEDDING_DIM, base_path, model_version=model_version)
+
+def _journals(store):
+    """
+    Journals of a store: one, or one per shard
+    """
+    if isinstance(store, ShardedVectorStore):
+        return [shard.journal for shard in store.shards]
+    return [store.journal]
+
+def _children_by_status(statuses=('Open', 'Resolved')):
+    """
+    Children by case status, keyed by embedding ID
+
+    Raises:
+        ConnectionError: If the database could not be queried; an empty answer
+            would otherwise read as "no open cases" and empty the gallery
+    """
+    children = get_children_by_status(statuses)
+    if children is None:
+        raise ConnectionError("Could not read case statuses from the database")
+    return {int(child["embedding_id"]): child for child in children}
+
+def _remove_child(store, embedding_id, region=None):
+    """
+    Remove every gallery embedding of a child from either store type
+    """
+    if isinstance(store, ShardedVectorStore):
+        if any(shard.contains(embedding_id) for shard in store.shards):
+            store.remove_embedding(embedding_id, region)
+    elif store.contains(embedding_id):
+        store.remove_embedding(embedding_id)
+
+# Per-process models for migration workers
+_worker_pipeline = None
+
+def _init_migration_worker():
+    """
+    Load the current detection and embedding models once per worker process
+    """
+    global _worker_pipeline
+
+    from pipeline import FacePipeline
+
+    # Stored photos were accepted at registration, so they are ranked but never
+    # dropped by the quality gate; a child must not fall out of the index
+    _worker_pipeline = FacePipeline(use_cache=False, video_workers=1, quality_gating=False).warm_up()
+
+def _embed_child(task):
+    """
+    Decrypt a child's stored photos in memory and embed the best face of each
+
+    Returns:
+        tuple: (embedding_id, list of embeddings)
+    """
+    from encryption import decrypt_image_bytes
+
+    embedding_id, image_paths = task
+    faces = []
+
+    for image_path in image_paths:
+        try:
+            data = decrypt_image_bytes(image_path)
+        except Exception as e:
+            logging.error(f"Could not decrypt {image_path}: {e}")
+            continue
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            logging.error(f"Could not decode {image_path}")
+            continue
+
+        detections = _worker_pipeline.detector.detect(image)
+        if detections:
+            faces.append(detections[0]["face"])
+
+    embeddings = [e for e in _worker_pipeline.embedder.extract_embeddings(faces) if e is not None]
+    return embedding_id, embeddings
+
+def switch_active_index(new_store, new_base_path, completed, ignored=frozenset(), base_path=FAISS_INDEX_PATH):
+    """
+    Make a fully built versioned index the active one
+
+    The active store's journal lock is held throughout, so registrations and
+    closures wait and then apply to the new index. Under the lock the active
+    store is snapshotted (emptying its journal), children that are in it but not
+    yet migrated are reported back instead of switching, and migrated children
+    whose case is now closed are removed from the new index. The current index is
+    then archived under its own model version and each new file is moved into
+    place with os.replace, index before metadata: a crash in between leaves new
+    vectors labelled with the old version, which blocks adds until migrate reruns.
+
+    Args:
+        new_store: Store of the new index
+        new_base_path (str): Base path of the new index
+        completed (set): Embedding IDs already migrated
+        ignored (set): Index entries with no database record to stop waiting for
+        base_path (str): Base path of the active index
+
+    Returns:
+        set: Embedding IDs still to migrate; the index was switched if empty
+
+    Raises:
+        ConnectionError: If the database could not be queried; nothing is switched
+    """
+    active_store = None
+    if all(os.path.exists(path) for path in _index_files(base_path)):
+        active_store = _open_store(base_path)
+
+    with ExitStack() as locks:
+        if active_store is not None:
+            for journal in _journals(active_store):
+                locks.enter_context(journal.lock())
+            # Catches up with other processes and empties the active journal
+            active_store.save_index()
+
+        open_children = _children_by_status()
+        closed_children = _children_by_status(('Closed',))
+
+        # Registered after the last poll, or journaled before their metadata was inserted
+        active_children = active_store.stored_child_ids() if active_store is not None else set()
+        pending = (set(open_children) | (active_children - set(closed_children) - set(ignored))) - completed
+        if pending:
+            return pending
+
+        # Closed while the migration ran: the new index must not bring them back
+        for embedding_id in completed & set(closed_children):
+            region = closed_children[embedding_id].get("last_known_location")
+            _remove_child(new_store, embedding_id, region)
+            logging.info(f"Removed {embedding_id} from the new index: case no longer open")
+
+        if not new_store.save_index():
+            raise RuntimeError("Could not snapshot the new index")
+
+        if active_store is not None:
+            old_version = read_index_metadata(_index_files(base_path)[0]).get("model_version", LEGACY_MODEL_VERSION)
+            archive_base = versioned_index_path(old_version, base_path)
+            if archive_base == new_base_path:
+                # Re-running with unchanged models: keep the previous build under its own name
+                archive_base = versioned_index_path(f"{old_version}.previous", base_path)
+            for active, archived in zip(_index_files(base_path), _index_files(archive_base)):
+                shutil.copy2(active, archived)
+                write_index_metadata(archived, old_version, EMBEDDING_DIM)
+            logging.info(f"Archived current index as {archive_base}")
+
+        for new, active in zip(_index_files(new_base_path), _index_files(base_path)):
+            os.replace(new, active)
+            os.replace(f"{new}.meta.json", f"{active}.meta.json")
+            # Both stores were snapshotted under the lock, so their journals are empty
+            for leftover in (f"{new}.journal", f"{active}.journal"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+    logging.info(f"Active index switched to {new_store.model_version}")
+    return set()
+
+def _migrate_children(store, new_base_path, completed, failed, workers, progress_path):
+    """
+    Poll, embed and switch over until every open child is migrated or one fails
+
+    Returns:
+        bool: True if the index was switched
+    """
+    ignored = set()
+    waiting = {}
+
+    with spawn_pool(workers, _init_migration_worker) as executor, open(progress_path, "a") as progress:
+        while True:
+            children = {
+                embedding_id: child
+                for embedding_id, child in _children_by_status().items()
+                if embedding_id not in completed | failed
+            }
+
+            if children:
+                logging.info(f"Migrating {len(children)} children across {workers} workers")
+                tasks = [(embedding_id, gallery_image_paths(embedding_id)) for embedding_id in children]
+
+                for embedding_id, embeddings in executor.map(_embed_child, tasks, chunksize=MIGRATION_BATCH_SIZE):
+                    region = children[embedding_id].get("last_known_location")
+
+                    # A child interrupted halfway through a previous run is rebuilt from scratch
+                    _remove_child(store, embedding_id, region)
+
+                    if not embeddings:
+                        logging.error(f"No usable face in stored images of {embedding_id}")
+                        failed.add(embedding_id)
+                        continue
+
+                    from embeddings import aggregate_template, select_representatives
+
+                    if GALLERY_MODE == 'set':
+                        gallery = select_representatives(embeddings, GALLERY_MAX_EMBEDDINGS)
+                    else:
+                        gallery = [aggregate_template(embeddings)]
+
+                    for vector_id, embedding in zip(gallery_vector_ids(embedding_id, len(gallery)), gallery):
+                        if isinstance(store, ShardedVectorStore):
+                            store.add_embedding(embedding, vector_id, region)
+                        else:
+                            store.add_embedding(embedding, vector_id)
+
+                    completed.add(embedding_id)
+                    progress.write(json.dumps({"embedding_id": embedding_id, "embeddings": len(embeddings)}) + "\n")
+                    progress.flush()
+
+                # Poll again until a pass finds no new children
+                continue
+
+            if failed:
+                return False
+
+            pending = switch_active_index(store, new_base_path, completed, ignored)
+            if not pending:
+                return True
+
+            # Registrations caught mid-flight: wait for their metadata, then migrate them
+            for embedding_id in pending:
+                waiting[embedding_id] = waiting.get(embedding_id, 0) + 1
+                if waiting[embedding_id] >= MIGRATION_SWITCH_RETRIES:
+                    logging.warning(f"Embedding {embedding_id} is in the index but has no open case; not migrating it")
+                    ignored.add(embedding_id)
+            logging.info(f"{len(pending)} children registered during migration; migrating them before switching")
+            time.sleep(MIGRATION_SWITCH_RETRY_SECONDS)
+
+def migrate(workers=None, model_version=MODEL_VERSION):
+    """
+    Re-embed every active child with the current models into a new versioned index
+
+    Progress is recorded per child next to the new index, so an interrupted run
+    resumes where it stopped. Children registered while the job runs are picked
+    up before switching over, and children closed while it runs are left out.
+    If any child's stored photos yield no usable face, or the database cannot be
+    read, the active index is kept so that no open case becomes unsearchable.
+
+    Args:
+        workers (int, optional): Worker processes, defaults to the CPU count
+        model_version (str): Version recorded for the new index
+
+    Returns:
+        bool: True if the new index was built and activated
+    """
+    workers = workers or os.cpu_count() or 1
+    new_base_path = versioned_index_path(model_version)
+    progress_path = f"{new_base_path}.progress"
+
+    completed = set()
+    if os.path.exists(progress_path):
+        with open(progress_path) as f:
+            completed = {json.loads(line)["embedding_id"] for line in f if line.strip()}
+        logging.info(f"Resuming migration: {len(completed)} children already migrated")
+        
+        if not all(os.path.exists(path) for path in _index_files(new_base_path)):
+            # Interrupted during switch-over: the partial build is gone, start again
+            logging.warning("Versioned index missing for recorded progress; restarting migration")
+            completed = set()
+            os.remove(progress_path)
+
+    store = _open_store(new_base_path, model_version)
+    for path in _index_files(new_base_path):
+        write_index_metadata(path, model_version, EMBEDDING_DIM)
+
+    failed = set()
+    try:
+        switched = _migrate_children(store, new_base_path, completed, failed, workers, progress_path)
+    except ConnectionError as e:
+        logging.error(f"{e}; active index left unchanged, rerun migrate.py to resume")
+        return False
+
+    if failed:
+        logging.error(
+            f"Stored photos of {len(failed)} children yield no usable face ({sorted(failed)}); "
+            f"add a clearer photo or close these cases, then rerun migrate.py. Active index left unchanged"
+        )
+        return False
+
+    if switched:
+        os.remove(progress_path)
+    return switched
+
+if __name__ == "__main__":
+    # Usage: python migrate.py [workers]
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    worker_count = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    if migrate(worker_count):
+        print(f"Migration to {MODEL_VERSION} complete.")
+    else:
+        print("Migration failed; see log for details.")
+        sys.exit(1)
@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import logging
+import numpy as np
+import torch
+from config import ONNX_OPSET, ONNX_PARITY_MIN_COSINE, ONNX_DETECTOR_PARITY_IMAGE, ONNX_DETECTOR_PARITY_MIN_IOU
+from tracking import box_iou
+
+def _quantized_path(onnx_path):
+    """
+    Path of the int8 variant of an exported ONNX model
+    """
+    return os.path.splitext(onnx_path)[0] + ".int8.onnx"
+
+def _torch_checkpoint_dir():
+    """
+    Directory where facenet_pytorch caches its pretrained weights
+    """
+    return os.path.join(os.path.dirname(torch.hub.get_dir()), "checkpoints")
+
+def quantize_onnx_model(onnx_path, quantized_path=None):
+    """
+    Apply dynamic int8 quantization to an exported ONNX model
+
+    Args:
+        onnx_path (str): Path to the float32 ONNX model
+        quantized_path (str, optional): Output path for the quantized model
+
+    Returns:
+        str: Path to the quantized model
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    if quantized_path is None:
+        quantized_path = _quantized_path(onnx_path)
+
+    if not os.path.exists(quantized_path):
+        quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+        logging.info(f"Quantized ONNX model saved to {quantized_path}")
+
+    return quantized_path
+
+def export_embedding_model(model, onnx_path, image_size=160):
+    """
+    Export an InceptionResnetV1 model to ONNX with a dynamic batch axis
+
+    Args:
+        model (torch.nn.Module): Embedding model in eval mode
+        onnx_path (str): Output path for the ONNX model
+        image_size (int): Input face size expected by the model
+
+    Returns:
+        str: Path to the exported model
+    """
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+
+    dummy_input = torch.zeros(1, 3, image_size, image_size)
+    model = model.cpu().eval()
+
+    torch.onnx.export(
+        model,
+        dummy_input,
+        onnx_path,
+        input_names=["input"],
+        output_names=["embedding"],
+        dynamic_axes={"input": {0: "batch"}, "embedding": {0: "batch"}},
+        opset_version=ONNX_OPSET
+    )
+    logging.info(f"Embedding model exported to {onnx_path}")
+    return onnx_path
+
+def export_detector_model(model_path, quantize=False, parity_image=ONNX_DETECTOR_PARITY_IMAGE):
+    """
+    Export YOLO face detection weights to ONNX next to the original weights
+
+    The model to load is only returned once it has matched the PyTorch detector
+    on a reference image; the result is recorded in a .parity.json file next to
+    it, so the check runs once per artifact.
+
+    Args:
+        model_path (str): Path to the YOLO .pt weights
+        quantize (bool): Whether to return a dynamic int8 variant
+        parity_image (str): Image with faces used for the parity check
+
+    Returns:
+        str: Path to the ONNX model to load
+
+    Raises:
+        RuntimeError: If the model fails the parity check (it is deleted) or
+            cannot be checked because the reference image is missing
+    """
+    from ultralytics import YOLO
+
+    onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+
+    if not os.path.exists(onnx_path):
+        exported_path = YOLO(model_path).export(format="onnx", dynamic=True, opset=ONNX_OPSET)
+        if os.path.abspath(exported_path) != os.path.abspath(onnx_path):
+            os.replace(exported_path, onnx_path)
+        logging.info(f"Detection model exported to {onnx_path}")
+
+    detector_path = quantize_onnx_model(onnx_path) if quantize else onnx_path
+    parity_path = f"{detector_path}.parity.json"
+    if os.path.exists(parity_path):
+        return detector_path
+
+    if not os.path.exists(parity_image):
+        raise RuntimeError(
+            f"ONNX detector {detector_path} is unverified: reference image {parity_image} not found "
+            f"(set ONNX_DETECTOR_PARITY_IMAGE to a photo with faces)"
+        )
+
+    report = check_detector_parity(model_path, detector_path, parity_image, ONNX_DETECTOR_PARITY_MIN_IOU)
+    if report["reference_boxes"] == 0:
+        raise RuntimeError(f"ONNX detector {detector_path} is unverified: no faces found in {parity_image}")
+    if not report["passed"]:
+        # Deleted so a later run re-exports instead of serving a degraded detector
+        os.remove(detector_path)
+        raise RuntimeError(f"ONNX detector {detector_path} failed the parity check")
+
+    with open(parity_path, "w") as f:
+        json.dump(report, f)
+    return detector_path
+
+class OnnxEmbeddingModel:
+    def __init__(self, load_torch_model, model_type='vggface2', quantize=False, cache_dir=None):
+        """
+        Run the face embedding model through ONNX Runtime on CPU
+
+        Args:
+            load_torch_model (callable): Returns the PyTorch model; only called when an
+                artifact has to be exported and checked for parity
+            model_type (str): Pretrained weights name, used to key the cached export
+            quantize (bool): Use the dynamic int8 quantized model
+            cache_dir (str, optional): Directory for exported models
+
+        Raises:
+            RuntimeError: If a newly produced model fails the parity check
+        """
+        import onnxruntime as ort
+
+        if cache_dir is None:
+            cache_dir = _torch_checkpoint_dir()
+
+        onnx_path = os.path.join(cache_dir, f"inception_resnet_v1_{model_type}.onnx")
+        model_path = _quantized_path(onnx_path) if quantize else onnx_path
+        newly_exported = not os.path.exists(model_path)
+
+        torch_model = None
+        if newly_exported:
+            torch_model = load_torch_model()
+            if not os.path.exists(onnx_path):
+                export_embedding_model(torch_model, onnx_path)
+            if quantize:
+                quantize_onnx_model(onnx_path)
+
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        logging.info(f"ONNX embedding model loaded from {model_path}")
+
+        # Verify accuracy the first time an artifact is produced; a failing artifact
+        # is deleted so later runs do not pick it up as a verified cached export
+        if newly_exported and not check_embedding_parity(torch_model, self)["passed"]:
+            self.session = None
+            os.remove(model_path)
+            raise RuntimeError(f"ONNX embedding model {model_path} failed the parity check")
+
+    def __call__(self, face_tensor):
+        """
+        Run inference with the same tensor-in, tensor-out contract as the PyTorch model
+        """
+        inputs = face_tensor.detach().cpu().numpy().astype(np.float32, copy=False)
+        outputs = self.session.run(None, {self.input_name: inputs})[0]
+        return torch.from_numpy(outputs)
+
+def check_embedding_parity(torch_model, onnx_model, samples=8, image_size=160, seed=0):
+    """
+    Compare ONNX embeddings against the PyTorch reference on random inputs
+
+    Args:
+        torch_model (torch.nn.Module): Reference PyTorch model
+        onnx_model (OnnxEmbeddingModel): Model under test
+        samples (int): Number of random faces to compare
+        image_size (int): Input face size
+        seed (int): Random seed for reproducible inputs
+
+    Returns:
+        dict: Minimum cosine similarity, maximum absolute difference and pass flag
+    """
+    generator = torch.Generator().manual_seed(seed)
+    inputs = torch.rand(samples, 3, image_size, image_size, generator=generator) * 2.0 - 1.0
+
+    with torch.no_grad():
+        reference = torch_model.cpu()(inputs).numpy()
+    candidate = onnx_model(inputs).numpy()
+
+    reference_norm = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate_norm = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+
+    cosine = np.sum(reference_norm * candidate_norm, axis=1)
+    report = {
+        "min_cosine": float(cosine.min()),
+        "max_abs_diff": float(np.abs(reference - candidate).max()),
+        "passed": bool(cosine.min() >= ONNX_PARITY_MIN_COSINE)
+    }
+
+    if report["passed"]:
+        logging.info(f"ONNX embedding parity check passed: {report}")
+    else:
+        logging.warning(f"ONNX embedding parity below threshold {ONNX_PARITY_MIN_COSINE}: {report}")
+
+    return report
+
+def check_detector_parity(model_path, onnx_path, image, min_iou=ONNX_DETECTOR_PARITY_MIN_IOU):
+    """
+    Compare ONNX detections against the PyTorch detector on a real image
+
+    Args:
+        model_path (str): Path to the YOLO .pt weights
+        onnx_path (str): Path to the exported ONNX model
+        image (numpy.ndarray or str): Image containing at least one face
+        min_iou (float): IoU required for a box to count as matched
+
+    Returns:
+        dict: Box counts, mean best IoU and pass flag
+    """
+    from ultralytics import YOLO
+
+    reference_boxes = YOLO(model_path)(image, verbose=False)[0].boxes.xyxy.cpu().numpy()
+    candidate_boxes = YOLO(onnx_path, task="detect")(image, verbose=False)[0].boxes.xyxy.cpu().numpy()
+
+    best_ious = [
+        max((box_iou(ref, cand) for cand in candidate_boxes), default=0.0)
+        for ref in reference_boxes
+    ]
+    mean_iou = float(np.mean(best_ious)) if best_ious else 1.0
+
+    report = {
+        "reference_boxes": int(len(reference_boxes)),
+        "candidate_boxes": int(len(candidate_boxes)),
+        "mean_iou": mean_iou,
+        "passed": len(reference_boxes) == len(candidate_boxes) and all(iou >= min_iou for iou in best_ious)
+    }
+
+    if report["passed"]:
+        logging.info(f"ONNX detector parity check passed: {report}")
+    else:
+        logging.warning(f"ONNX detector parity check failed: {report}")
+
+    return report
+
+if __name__ == "__main__":
+    # Usage: python onnx_backend.py detector_weights.pt image_with_faces.jpg [--quantize]
+    logging.basicConfig(level=logging.INFO)
+
+    if len(sys.argv) < 3:
+        print("Usage: python onnx_backend.py <detector_weights.pt> <image> [--quantize]")
+        sys.exit(1)
+
+    weights_path, image_path = sys.argv[1], sys.argv[2]
+    # Exporting verifies against the given image, so later runs serve the model without re-checking
+    detector_onnx_path = export_detector_model(weights_path, quantize="--quantize" in sys.argv, parity_image=image_path)
+    print(check_detector_parity(weights_path, detector_onnx_path, image_path))
@@ -0,0 +1,97 @@
+import logging
+from config import CACHE_ENABLED, VIDEO_WORKERS, QUALITY_GATING
+
+class FacePipeline:
+    def __init__(self, use_cache=CACHE_ENABLED, video_workers=VIDEO_WORKERS, quality_gating=QUALITY_GATING):
+        """
+        Detection and embedding pipeline with warm models and a content-hash cache
+
+        Models are loaded on first use, so inputs served from the cache never
+        pay for loading YOLO or InceptionResnetV1.
+
+        Args:
+            use_cache (bool): Look up and store results in the detection cache
+            video_workers (int): Processes used for video sharding
+            quality_gating (bool): Drop low-quality faces; with False they are only ranked
+        """
+        self.video_workers = video_workers
+        self.quality_gating = quality_gating
+        self._detector = None
+        self._embedder = None
+        self.cache = None
+
+        if use_cache:
+            from cache import DetectionCache
+            self.cache = DetectionCache(quality_gating=quality_gating)
+
+    @property
+    def detector(self):
+        if self._detector is None:
+            from face_detection import FaceDetector
+            self._detector = FaceDetector(quality_gating=self.quality_gating)
+        return self._detector
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from embeddings import FaceEmbedding
+            self._embedder = FaceEmbedding()
+        return self._embedder
+
+    def warm_up(self):
+        """
+        Load both models now, e.g. in a worker process before its first input
+        """
+        self.detector
+        self.embedder
+        return self
+
+    def _run_models(self, input_path, is_video):
+        """
+        Detect and embed faces without consulting the cache
+        """
+        from face_detection import detect_video, detect_video_sharded
+
+        if is_video and self.video_workers > 1:
+            # Workers detect and embed their own segments; records arrive in timestamp order
+            return detect_video_sharded(input_path, self.video_workers, embed=True)
+
+        if is_video:
+            return detect_video(self.detector, input_path, self.embedder)
+
+        records = self.detector.detect(input_path)
+        embeddings = self.embedder.extract_embeddings([r["face"] for r in records])
+        for record, embedding in zip(records, embeddings):
+            record["embedding"] = embedding
+        return records
+
+    def analyze(self, input_path, is_video=False):
+        """
+        Detect faces and extract embeddings for an image or video
+
+        Args:
+            input_path (str): Path to image or video
+            is_video (bool): Whether input is a video
+
+        Returns:
+            list: Records with 'bbox', 'confidence' and 'embedding' (plus 'frame_idx'
+            and 'timestamp' for videos). Freshly computed records also carry 'face'.
+        """
+        key = None
+        if self.cache is not None:
+            try:
+                key = self.cache.key_for(input_path)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+            except OSError as e:
+                logging.warning(f"Cache lookup failed for {input_path}: {e}")
+                key = None
+
+        records = self._run_models(input_path, is_video)
+
+        # Empty results are not cached so transient read or model errors are retried
+        if key is not None and records:
+            self.cache.put(key, records)
+
+        return records
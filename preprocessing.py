@@ -0,0 +1,78 @@
+import cv2
+import numpy as np
+import torch
+import logging
+from config import FACE_SIZE, FACE_BATCH_SIZE, FACE_INPUT_RGB
+
+class FacePreprocessor:
+    def __init__(self, batch_size=FACE_BATCH_SIZE, face_size=FACE_SIZE, to_rgb=FACE_INPUT_RGB):
+        """
+        Preallocated preprocessing stage for face crops
+
+        Crops are written straight into a reusable uint8 NHWC buffer and converted
+        to a normalized NCHW float tensor in a single pass.
+
+        Args:
+            batch_size (int): Initial buffer capacity in faces
+            face_size (int): Square input size of the embedding model
+            to_rgb (bool): Convert BGR crops to RGB
+        """
+        self.face_size = face_size
+        self.to_rgb = to_rgb
+        self.buffer = np.empty((batch_size, face_size, face_size, 3), dtype=np.uint8)
+
+    def _ensure_capacity(self, count):
+        """
+        Grow the batch buffer geometrically when a larger batch arrives
+        """
+        if count > len(self.buffer):
+            capacity = max(count, 2 * len(self.buffer))
+            self.buffer = np.empty((capacity, self.face_size, self.face_size, 3), dtype=np.uint8)
+            logging.info(f"Face batch buffer grown to {capacity}")
+
+    def write_crop(self, index, crop):
+        """
+        Write a single BGR crop into the batch buffer slot
+
+        Args:
+            index (int): Slot in the batch buffer
+            crop (numpy.ndarray): HxWx3 face crop
+        """
+        slot = self.buffer[index]
+
+        if crop.dtype != np.uint8:
+            crop = np.clip(crop, 0, 255).astype(np.uint8)
+
+        # Resize only when the detector has not already produced a model-sized crop
+        if crop.shape[:2] == (self.face_size, self.face_size):
+            if self.to_rgb:
+                cv2.cvtColor(crop, cv2.COLOR_BGR2RGB, dst=slot)
+            else:
+                np.copyto(slot, crop)
+        else:
+            cv2.resize(crop, (self.face_size, self.face_size), dst=slot)
+            if self.to_rgb:
+                cv2.cvtColor(slot, cv2.COLOR_BGR2RGB, dst=slot)
+
+    def prepare(self, crops, device):
+        """
+        Build a normalized model input batch from face crops
+
+        Args:
+            crops (list): HxWx3 BGR face crops
+            device (torch.device): Target device
+
+        Returns:
+            torch.Tensor: Nx3xHxW float tensor scaled to [-1, 1]
+        """
+        count = len(crops)
+        self._ensure_capacity(count)
+
+        for i, crop in enumerate(crops):
+            self.write_crop(i, crop)
+
+        # Shares memory with the buffer; the float conversion is the only copy
+        batch = torch.from_numpy(self.buffer[:count]).to(device).permute(0, 3, 1, 2).float()
+
+        # Same scaling as (x / 255 - 0.5) * 2, applied in place
+        return batch.div_(127.5).sub_(1.0)
@@ -0,0 +1,112 @@
+import cv2
+from config import (
+    QUALITY_MIN_FACE_SIZE,
+    QUALITY_MIN_CONFIDENCE,
+    QUALITY_MIN_SHARPNESS,
+    QUALITY_MIN_BRIGHTNESS,
+    QUALITY_MAX_BRIGHTNESS,
+    QUALITY_EDGE_MARGIN
+)
+
+class FaceQualityFilter:
+    def __init__(
+        self,
+        min_face_size=QUALITY_MIN_FACE_SIZE,
+        min_confidence=QUALITY_MIN_CONFIDENCE,
+        min_sharpness=QUALITY_MIN_SHARPNESS,
+        min_brightness=QUALITY_MIN_BRIGHTNESS,
+        max_brightness=QUALITY_MAX_BRIGHTNESS,
+        edge_margin=QUALITY_EDGE_MARGIN
+    ):
+        """
+        Cheap face quality scoring used to rank and drop crops before embedding
+
+        Args:
+            min_face_size (int): Minimum box side in pixels
+            min_confidence (float): Minimum detector confidence
+            min_sharpness (float): Minimum Laplacian variance of the grayscale crop
+            min_brightness (float): Minimum mean grayscale intensity
+            max_brightness (float): Maximum mean grayscale intensity
+            edge_margin (int): Distance to the frame edge below which a box is truncated
+        """
+        self.min_face_size = min_face_size
+        self.min_confidence = min_confidence
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.edge_margin = edge_margin
+
+    def score(self, face, bbox, confidence, image_shape):
+        """
+        Score a single face crop
+
+        Args:
+            face (numpy.ndarray): Face crop resized to the embedding input size
+            bbox (tuple): Box (x1, y1, x2, y2) in the source image
+            confidence (float): Detector confidence
+            image_shape (tuple): Shape of the source image
+
+        Returns:
+            dict: Individual measurements, combined 'score' in [0, 1] and 'passed'
+        """
+        x1, y1, x2, y2 = bbox
+        height, width = image_shape[:2]
+        face_size = min(x2 - x1, y2 - y1)
+
+        gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        # Measured on the fixed-size crop, so tiny upscaled faces read as blurry
+        sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        brightness = float(gray.mean())
+
+        truncated = (
+            x1 <= self.edge_margin or y1 <= self.edge_margin
+            or x2 >= width - self.edge_margin or y2 >= height - self.edge_margin
+        )
+
+        passed = (
+            face_size >= self.min_face_size
+            and confidence >= self.min_confidence
+            and sharpness >= self.min_sharpness
+            and self.min_brightness <= brightness <= self.max_brightness
+        )
+
+        # Each term saturates at twice its threshold
+        score = (
+            min(1.0, face_size / (2.0 * self.min_face_size))
+            * min(1.0, confidence)
+            * min(1.0, sharpness / (2.0 * self.min_sharpness))
+            * (1.0 if self.min_brightness <= brightness <= self.max_brightness else 0.5)
+            * (0.5 if truncated else 1.0)
+        )
+
+        return {
+            "face_size": int(face_size),
+            "confidence": float(confidence),
+            "sharpness": sharpness,
+            "brightness": brightness,
+            "truncated": bool(truncated),
+            "score": float(score),
+            "passed": bool(passed)
+        }
+
+    def filter(self, detections, image_shape, drop=True):
+        """
+        Attach quality scores to detections and rank them best first
+
+        Args:
+            detections (list): Detection dicts with 'bbox', 'confidence' and 'face'
+            image_shape (tuple): Shape of the source image
+            drop (bool): Remove detections that fail a threshold
+
+        Returns:
+            list: Detections with a 'quality' entry, sorted by descending score
+        """
+        for detection in detections:
+            detection["quality"] = self.score(
+                detection["face"], detection["bbox"], detection["confidence"], image_shape
+            )
+
+        if drop:
+            detections = [d for d in detections if d["quality"]["passed"]]
+
+        return sorted(detections, key=lambda d: d["quality"]["score"], reverse=True)
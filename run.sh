@@ -10,8 +10,39 @@ pip install -r requirements.txt
 # Register a Lost Child (Image)
 python main.py register child_image.jpg "John Doe" 8 "Male" "+1234567890"
 
+# Register a Lost Child (Several Photos)
+python main.py register child_photo1.jpg,child_photo2.jpg "John Doe" 8 "Male" "+1234567890"
+
+# Register a Lost Child with Last Known Location (routes to a shard with FAISS_SHARD_STRATEGY=region)
+python main.py register child_image.jpg "John Doe" 8 "Male" "+1234567890" "Central Station"
+
 # Identify Found Child (Image)
 python main.py identify found_child_image.jpg
 
-# Identify Found Child (Video)
-python main.py identify found_child_video.mp4
\ No newline at end of file
+# Identify Found Child (Video, also writes an annotated found_child_video_detected.mp4)
+python main.py identify found_child_video.mp4
+
+# Identify Found Child (Video, without the annotated copy and its extra decode/encode pass)
+python main.py identify found_child_video.mp4 --no-video
+
+# Identify with ONNX Runtime on CPU (the exported detector is checked against PyTorch on a photo with faces first)
+INFERENCE_BACKEND=onnx ONNX_QUANTIZE=1 ONNX_DETECTOR_PARITY_IMAGE=reference_faces.jpg python main.py identify found_child_image.jpg
+
+# Identify in High-Resolution CCTV Footage (tiled detection for distant faces)
+TILED_DETECTION=1 python main.py identify cctv_4k_video.mp4
+
+# Identify Unattended Across a Folder or Manifest (writes a resumable JSONL match report)
+python main.py identify-batch evidence_folder --report evidence_matches.jsonl --workers 4
+
+# Identify from a Live Camera / RTSP Stream
+python main.py stream rtsp://camera.local/stream1
+
+# Re-embed the gallery after changing detection/embedding models
+python migrate.py 8
+
+# Split an existing gallery into shards (required before setting FAISS_NUM_SHARDS>1 on a
+# deployment that already has faiss_index.bin; the shards are rebuilt from the stored photos)
+FAISS_NUM_SHARDS=4 FAISS_SHARD_STRATEGY=region python migrate.py 8
+
+# Measure CLI startup time per command
+python benchmarks.py startup
\ No newline at end of file
@@ -0,0 +1,103 @@
+import cv2
+import numpy as np
+from config import (
+    SAMPLER_BUDGET_FPS,
+    SAMPLER_MIN_FPS,
+    SAMPLER_PROBE_FPS,
+    SAMPLER_MOTION_THRESHOLD,
+    SAMPLER_SCENE_THRESHOLD
+)
+
+class AdaptiveFrameSampler:
+    def __init__(
+        self,
+        fps,
+        budget_fps=SAMPLER_BUDGET_FPS,
+        min_fps=SAMPLER_MIN_FPS,
+        probe_fps=SAMPLER_PROBE_FPS,
+        motion_threshold=SAMPLER_MOTION_THRESHOLD,
+        scene_threshold=SAMPLER_SCENE_THRESHOLD,
+        probe_size=(64, 36)
+    ):
+        """
+        Motion and scene-change aware frame sampler with a compute budget
+
+        Frames are compared on a tiny grayscale thumbnail against the last sampled
+        frame. Unchanged frames are skipped, motion and scene cuts are sampled,
+        and a token bucket caps detector calls at budget_fps per second of video.
+
+        Args:
+            fps (float): Video frame rate
+            budget_fps (float): Maximum sampled frames per second of video
+            min_fps (float): Minimum sampled frames per second, even without change
+            probe_fps (float): Frames per second decoded and checked for change
+            motion_threshold (float): Mean absolute difference that counts as motion
+            scene_threshold (float): Histogram correlation below which the scene changed
+            probe_size (tuple): Thumbnail size used for comparisons
+        """
+        self.fps = fps
+        self.budget_fps = budget_fps
+        self.max_gap = 1.0 / min_fps if min_fps > 0 else float("inf")
+        self.probe_stride = max(1, int(round(fps / probe_fps)))
+        self.motion_threshold = motion_threshold
+        self.scene_threshold = scene_threshold
+        self.probe_size = probe_size
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the previous sample, e.g. at the start of a new segment
+        """
+        self.last_probe = None
+        self.last_hist = None
+        self.last_sample_time = None
+        self.last_probe_time = None
+        # Start with a full bucket so the first frames of a segment are never starved
+        self.tokens = max(1.0, self.budget_fps)
+
+    def is_probe_frame(self, frame_idx):
+        """
+        Whether a frame should be decoded and checked (global grid, independent of range start)
+        """
+        return frame_idx % self.probe_stride == 0
+
+    def should_sample(self, frame_idx, frame):
+        """
+        Decide whether a probed frame should go to the detector
+
+        Args:
+            frame_idx (int): Frame index in the video
+            frame (numpy.ndarray): Decoded BGR frame
+
+        Returns:
+            bool: True if the frame should be processed
+        """
+        timestamp = frame_idx / self.fps
+
+        # Refill the budget for the video time elapsed since the previous probe
+        if self.last_probe_time is not None:
+            elapsed = timestamp - self.last_probe_time
+            self.tokens = min(max(1.0, self.budget_fps), self.tokens + elapsed * self.budget_fps)
+        self.last_probe_time = timestamp
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        probe = cv2.resize(gray, self.probe_size, interpolation=cv2.INTER_AREA)
+        hist = cv2.calcHist([probe], [0], None, [32], [0, 256])
+        cv2.normalize(hist, hist)
+
+        if self.last_probe is None:
+            changed = True
+        else:
+            motion = float(np.mean(cv2.absdiff(probe, self.last_probe)))
+            scene_change = cv2.compareHist(hist, self.last_hist, cv2.HISTCMP_CORREL) < self.scene_threshold
+            stale = timestamp - self.last_sample_time >= self.max_gap
+            changed = scene_change or motion >= self.motion_threshold or stale
+
+        if not changed or self.tokens < 1.0:
+            return False
+
+        self.tokens -= 1.0
+        self.last_probe = probe
+        self.last_hist = hist
+        self.last_sample_time = timestamp
+        return True
@@ -1,4 +1,5 @@
 import os
+import glob
 import shutil
 from config import IMAGE_STORAGE_PATH
 from encryption import encrypt_image, decrypt_image
@@ -33,4 +34,18 @@ def retrieve_encrypted_image(encrypted_path, output_path):
         encrypted_path (str): Encrypted image path
         output_path (str): Decrypted image output path
     """
-    decrypt_image(encrypted_path, output_path)
\ No newline at end of file
+    decrypt_image(encrypted_path, output_path)
+
+def gallery_image_paths(embedding_id):
+    """
+    Encrypted images stored for a child: the primary photo and any extra gallery photos
+    
+    Args:
+        embedding_id (int): Unique embedding identifier
+    
+    Returns:
+        list: Paths to encrypted images, primary first
+    """
+    primary = os.path.join(IMAGE_STORAGE_PATH, f"{embedding_id}.enc")
+    extra = sorted(glob.glob(os.path.join(IMAGE_STORAGE_PATH, f"{embedding_id}_*.enc")))
+    return ([primary] if os.path.exists(primary) else []) + extra
@@ -0,0 +1,281 @@
+import time
+import logging
+import threading
+import cv2
+from config import (
+    STREAM_MAX_LATENCY,
+    STREAM_MATCH_COOLDOWN,
+    STREAM_METRICS_INTERVAL,
+    SIMILARITY_THRESHOLD,
+    MAX_MATCHES,
+    FAISS_MMAP,
+    VIDEO_OUTPUT_SEGMENTS_ONLY
+)
+
+def parse_source(source):
+    """
+    Interpret a stream source: a device index, or an RTSP/HTTP URL or file path
+    """
+    return int(source) if str(source).isdigit() else source
+
+class LatestFrameReader:
+    def __init__(self, source, realtime=False):
+        """
+        Read frames on a background thread, keeping only the most recent one
+
+        When processing falls behind, older frames are overwritten rather than
+        queued, so the consumer always sees the freshest frame.
+
+        Args:
+            source (str or int): Anything cv2.VideoCapture can open
+            realtime (bool): Pace file playback at the file's frame rate
+        """
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open stream source: {source}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.realtime = realtime
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.finished = False
+
+        self._latest = None
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def _read_loop(self):
+        start = time.monotonic()
+        frame_idx = 0
+
+        try:
+            while self._running:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+
+                if self.realtime:
+                    delay = start + frame_idx / self.fps - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                with self._condition:
+                    if self._latest is not None:
+                        self.frames_dropped += 1
+                    self._latest = (frame_idx, time.monotonic(), frame)
+                    self.frames_read += 1
+                    self._condition.notify()
+
+                frame_idx += 1
+        finally:
+            # Only this thread touches the capture, so it is never released mid-read
+            self.cap.release()
+
+        with self._condition:
+            self.finished = True
+            self._condition.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Wait for and take the most recent unread frame
+
+        Returns:
+            tuple or None: (frame_idx, capture time, frame), None on timeout or end of stream
+        """
+        with self._condition:
+            if self._latest is None and not self.finished:
+                self._condition.wait(timeout)
+            latest, self._latest = self._latest, None
+            return latest
+
+    def stop(self):
+        """
+        Stop the reader thread, which releases the capture on its way out
+        """
+        self._running = False
+        self._thread.join(timeout=2.0)
+        if self._thread.is_alive():
+            # Blocked in read() on a stalled stream; the capture is released once it returns
+            logging.warning("Stream reader still blocked on the source; leaving it to exit on its own")
+
+class StreamIdentifier:
+    def __init__(
+        self,
+        source,
+        realtime=False,
+        max_latency=STREAM_MAX_LATENCY,
+        similarity_threshold=SIMILARITY_THRESHOLD,
+        match_cooldown=STREAM_MATCH_COOLDOWN,
+        output_path=None
+    ):
+        """
+        Continuous identification on a live camera, RTSP stream or paced file
+
+        Args:
+            source (str or int): Anything cv2.VideoCapture can open
+            realtime (bool): Pace file playback at the file's frame rate
+            max_latency (float): Frames older than this many seconds are skipped
+            similarity_threshold (float): Minimum similarity for a match
+            match_cooldown (float): Seconds before the same child is reported again
+            output_path (str, optional): Write annotated processed frames to this video
+        """
+        from face_detection import FaceDetector
+        from embeddings import FaceEmbedding
+        from vector_store import get_vector_store
+
+        # Models and index are loaded once and stay warm for the whole stream
+        self.detector = FaceDetector()
+        self.embedder = FaceEmbedding()
+        self.vector_store = get_vector_store(mmap=FAISS_MMAP)
+
+        self.source = source
+        self.realtime = realtime
+        self.max_latency = max_latency
+        self.similarity_threshold = similarity_threshold
+        self.match_cooldown = match_cooldown
+        self.output_path = output_path
+        self._last_reported = {}
+        # Last processed frame, for the motion map of tiled detection
+        self._previous_frame = None
+
+        self.metrics = {
+            "frames_read": 0,
+            "frames_dropped": 0,
+            "frames_stale": 0,
+            "frames_processed": 0,
+            "matches": 0,
+            "max_latency": 0.0,
+            "mean_latency": 0.0
+        }
+
+    def _process_frame(self, frame_idx, capture_time, frame):
+        """
+        Detect, embed and search one frame
+
+        Returns:
+            tuple: (match events for this frame, detections with their 'matches')
+        """
+        detections = self.detector.detect(frame, self._previous_frame)
+        self._previous_frame = frame
+        embeddings = self.embedder.extract_embeddings([d["face"] for d in detections])
+
+        events = []
+        for detection, embedding in zip(detections, embeddings):
+            detection["matches"] = []
+            if embedding is None:
+                continue
+
+            for similarity, embedding_id in self.vector_store.search_with_scores(embedding, MAX_MATCHES):
+                if similarity <= self.similarity_threshold:
+                    continue
+                detection["matches"].append(embedding_id)
+
+                # Suppress repeats of a child still in view
+                last = self._last_reported.get(embedding_id)
+                if last is not None and capture_time - last < self.match_cooldown:
+                    continue
+                self._last_reported[embedding_id] = capture_time
+
+                events.append({
+                    "embedding_id": embedding_id,
+                    "similarity": similarity,
+                    "frame_idx": frame_idx,
+                    "bbox": detection["bbox"],
+                    "wall_time": time.time()
+                })
+
+        return events, detections
+
+    def _update_metrics(self, reader, latency):
+        processed = self.metrics["frames_processed"]
+        self.metrics["mean_latency"] = (self.metrics["mean_latency"] * (processed - 1) + latency) / processed
+        self.metrics["max_latency"] = max(self.metrics["max_latency"], latency)
+        self.metrics["frames_read"] = reader.frames_read
+        self.metrics["frames_dropped"] = reader.frames_dropped
+
+    def run(self, on_match, duration=None):
+        """
+        Process the stream until it ends, the duration elapses or KeyboardInterrupt
+
+        Args:
+            on_match (callable): Called with each match event dict as it happens
+            duration (float, optional): Maximum run time in seconds
+
+        Returns:
+            dict: Final metrics
+        """
+        reader = LatestFrameReader(self.source, self.realtime)
+        start = time.monotonic()
+        last_metrics_log = start
+        renderer = None
+        tracker = None
+        last_rendered_idx = None
+
+        try:
+            while duration is None or time.monotonic() - start < duration:
+                item = reader.read()
+                if item is None:
+                    if reader.finished:
+                        break
+                    continue
+
+                frame_idx, capture_time, frame = item
+
+                # Starting on an old frame would break the latency bound
+                if time.monotonic() - capture_time > self.max_latency:
+                    self.metrics["frames_stale"] += 1
+                    continue
+
+                events, detections = self._process_frame(frame_idx, capture_time, frame)
+
+                if self.output_path:
+                    from video_writer import AnnotatedVideoRenderer
+                    from tracking import IouTracker
+
+                    if renderer is None:
+                        height, width = frame.shape[:2]
+                        # Non-blocking writes: a slow encoder drops output frames, never stalls detection
+                        try:
+                            renderer = AnnotatedVideoRenderer(
+                                self.output_path, reader.fps, (width, height),
+                                segments_only=VIDEO_OUTPUT_SEGMENTS_ONLY, block=False
+                            )
+                        except IOError as e:
+                            # Keep identifying; only the recording is lost
+                            logging.error(f"Annotated output disabled: {e}")
+                            self.output_path = None
+                        tracker = IouTracker()
+
+                if renderer is not None:
+                    for detection, track_id in zip(detections, tracker.update([d["bbox"] for d in detections])):
+                        detection["track_id"] = track_id
+                    # The output runs at the source rate, so fill frames skipped by detection
+                    hold = 0 if last_rendered_idx is None else frame_idx - last_rendered_idx - 1
+                    renderer.add_frame(frame, detections, capture_time - start, hold=hold)
+                    last_rendered_idx = frame_idx
+
+                latency = time.monotonic() - capture_time
+                self.metrics["frames_processed"] += 1
+                self._update_metrics(reader, latency)
+
+                for event in events:
+                    event["latency"] = latency
+                    self.metrics["matches"] += 1
+                    on_match(event)
+
+                if time.monotonic() - last_metrics_log >= STREAM_METRICS_INTERVAL:
+                    logging.info(f"Stream metrics: {self.metrics}")
+                    last_metrics_log = time.monotonic()
+        except KeyboardInterrupt:
+            logging.info("Stream identification interrupted")
+        finally:
+            reader.stop()
+            if renderer is not None:
+                renderer.close()
+            self.metrics["frames_read"] = reader.frames_read
+            self.metrics["frames_dropped"] = reader.frames_dropped
+
+        logging.info(f"Final stream metrics: {self.metrics}")
+        return self.metrics
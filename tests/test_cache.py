@@ -0,0 +1,23 @@
+import numpy as np
+from cache import DetectionCache
+from config import EMBEDDING_DIM
+
+def test_cache_hit_returns_quality_scores(tmp_path):
+    cache = DetectionCache(str(tmp_path), max_bytes=1 << 20)
+    quality = {
+        "face_size": 42,
+        "confidence": 0.5,
+        "sharpness": 12.5,
+        "brightness": 90.0,
+        "truncated": True,
+        "score": 0.2,
+        "passed": False
+    }
+    record = {"bbox": (1, 2, 43, 44), "confidence": 0.5, "quality": quality, "embedding": np.ones(EMBEDDING_DIM)}
+
+    cache.put("key", [record])
+    hit = cache.get("key")
+
+    assert len(hit) == 1
+    assert hit[0]["quality"] == quality
+    assert hit[0]["bbox"] == record["bbox"]
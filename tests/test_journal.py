@@ -0,0 +1,104 @@
+import os
+import numpy as np
+from journal import EmbeddingJournal, OP_ADD, OP_REMOVE
+from vector_store import VectorStore
+
+DIM = 8
+
+def _vector(seed):
+    vector = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_replay_stops_before_torn_tail_without_modifying_file(tmp_path):
+    journal = EmbeddingJournal(str(tmp_path / "index.bin.journal"), DIM, fsync=False)
+    journal.append_add(1, _vector(1))
+    journal.append_remove(2)
+    complete_size = journal.append_add(3, _vector(3))
+    journal.close()
+
+    # A crash in the middle of appending the next record
+    with open(journal.path, "ab") as f:
+        f.write(b"\x01\x04\x00\x00")
+
+    records, end = journal.replay()
+    assert [(op, embedding_id) for op, embedding_id, _ in records] == [(OP_ADD, 1), (OP_REMOVE, 2), (OP_ADD, 3)]
+    np.testing.assert_allclose(records[0][2], _vector(1))
+    assert end == complete_size
+    assert journal.size() == complete_size + 4
+
+    # Only the writer cuts the tail, then appends start on a clean record
+    journal.truncate(end)
+    assert journal.size() == complete_size
+    journal.append_remove(1)
+    journal.close()
+    records, _ = journal.replay()
+    assert [(op, embedding_id) for op, embedding_id, _ in records][-1] == (OP_REMOVE, 1)
+
+def test_replay_from_offset_returns_only_newer_records(tmp_path):
+    journal = EmbeddingJournal(str(tmp_path / "index.bin.journal"), DIM, fsync=False)
+    offset = journal.append_add(1, _vector(1))
+    journal.append_add(2, _vector(2))
+    journal.close()
+
+    records, _ = journal.replay(offset)
+    assert [embedding_id for _, embedding_id, _ in records] == [2]
+
+def test_journaled_mutations_survive_a_crash_before_snapshot(tmp_path):
+    index_path = str(tmp_path / "index.bin")
+    store = VectorStore(DIM, index_path)
+    store.add_embedding(_vector(1), 1)
+    store.add_embedding(_vector(2), 2)
+    store.remove_embedding(1)
+    store.journal.close()
+
+    # Torn record from a crash mid-append
+    with open(store.journal.path, "ab") as f:
+        f.write(b"\x01\x05")
+
+    recovered = VectorStore(DIM, index_path)
+    assert not recovered.contains(1)
+    assert recovered.contains(2)
+    assert recovered.search_with_scores(_vector(2), 1)[0][1] == 2
+
+    # The next writer drops the torn tail before appending
+    recovered.add_embedding(_vector(3), 3)
+    reopened = VectorStore(DIM, index_path)
+    assert reopened.contains(2) and reopened.contains(3)
+
+def test_snapshot_keeps_records_appended_by_another_process(tmp_path):
+    index_path = str(tmp_path / "index.bin")
+    first = VectorStore(DIM, index_path)
+    second = VectorStore(DIM, index_path)
+
+    first.add_embedding(_vector(1), 1)
+    second.add_embedding(_vector(2), 2)
+    assert second.save_index()
+    assert os.path.getsize(second.journal.path) == 0
+
+    # first notices the new snapshot before writing again
+    first.add_embedding(_vector(3), 3)
+    reopened = VectorStore(DIM, index_path)
+    assert all(reopened.contains(i) for i in (1, 2, 3))
+
+def test_memory_mapped_store_layers_journal_over_snapshot(tmp_path):
+    index_path = str(tmp_path / "index.bin")
+    writer = VectorStore(DIM, index_path)
+    writer.add_embedding(_vector(1), 1)
+    writer.add_embedding(_vector(2), 2)
+    writer.save_index()
+    writer.remove_embedding(1)
+    writer.add_embedding(_vector(3), 3)
+
+    reader = VectorStore(DIM, index_path, mmap=True)
+    assert reader.read_only
+    assert not reader.contains(1)
+    assert reader.contains(2) and reader.contains(3)
+    assert reader.search_with_scores(_vector(3), 1)[0][1] == 3
+    assert 1 not in [embedding_id for _, embedding_id in reader.search_with_scores(_vector(1), 5)]
+
+    # A mutation reloads the snapshot into RAM and replays the journal into it
+    reader.add_embedding(_vector(4), 4)
+    assert not reader.read_only
+    assert not reader.contains(1)
+    assert all(reader.contains(i) for i in (2, 3, 4))
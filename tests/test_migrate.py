@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+import migrate
+from config import LEGACY_MODEL_VERSION
+from vector_store import VectorStore, gallery_vector_ids, read_index_metadata
+
+DIM = 8
+NEW_VERSION = "yolov8n-face+vggface2+rgb"
+
+def _vector(seed):
+    vector = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+def _build(path, model_version, children):
+    store = VectorStore(DIM, path, model_version=model_version)
+    for embedding_id in children:
+        store.add_embedding(_vector(embedding_id), gallery_vector_ids(embedding_id, 1)[0])
+    store.save_index()
+    return store
+
+@pytest.fixture
+def indexes(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrate, "EMBEDDING_DIM", DIM)
+    base_path = str(tmp_path / "faiss_index.bin")
+    new_base_path = migrate.versioned_index_path(NEW_VERSION, base_path)
+    _build(base_path, LEGACY_MODEL_VERSION, [1, 2])
+    # The active index is opened with the current models, which the legacy build predates
+    monkeypatch.setattr(migrate, "_open_store", lambda path: VectorStore(DIM, path, model_version=NEW_VERSION))
+    return base_path, new_base_path, _build(new_base_path, NEW_VERSION, [1, 2])
+
+def test_switch_aborts_when_database_is_unreachable(indexes, monkeypatch):
+    base_path, new_base_path, new_store = indexes
+    monkeypatch.setattr(migrate, "get_children_by_status", lambda statuses=None: None)
+
+    with pytest.raises(ConnectionError):
+        migrate.switch_active_index(new_store, new_base_path, {1, 2}, base_path=base_path)
+
+    active = VectorStore(DIM, base_path, model_version=LEGACY_MODEL_VERSION)
+    assert active.stored_child_ids() == {1, 2}
+    assert read_index_metadata(base_path)["model_version"] == LEGACY_MODEL_VERSION
+
+def test_switch_removes_only_closed_children(indexes, monkeypatch):
+    base_path, new_base_path, new_store = indexes
+    # Child 1 has no record in either query, e.g. deleted by hand; only a closed case is removed
+    monkeypatch.setattr(
+        migrate, "get_children_by_status",
+        lambda statuses=('Open', 'Resolved'): [{"embedding_id": 2}] if statuses == ('Closed',) else []
+    )
+
+    assert migrate.switch_active_index(new_store, new_base_path, {1, 2}, ignored={1}, base_path=base_path) == set()
+
+    active = VectorStore(DIM, base_path, model_version=NEW_VERSION)
+    assert not active.version_mismatch
+    assert active.stored_child_ids() == {1}
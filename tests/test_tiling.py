@@ -0,0 +1,38 @@
+import numpy as np
+from face_detection import tile_grid, tile_activity, select_tiles
+
+NO_CANDIDATES = np.zeros((0, 5), dtype=np.float32)
+
+def test_grid_overlaps_and_covers_the_frame():
+    tiles = tile_grid((2160, 3840, 3), tile_size=640, overlap=0.25)
+    assert tiles[0] == (0, 0, 640, 640)
+    assert tiles[1] == (480, 0, 1120, 640)
+    assert tiles[-1] == (3200, 1520, 3840, 2160)
+
+def test_static_frame_selects_no_tiles():
+    for shape in ((1080, 1920, 3), (2160, 3840, 3)):
+        frame = np.full(shape, 128, dtype=np.uint8)
+        tiles = tile_grid(shape)
+        assert select_tiles(tiles, tile_activity(frame, tiles, frame), NO_CANDIDATES) == []
+        assert select_tiles(tiles, tile_activity(frame, tiles), NO_CANDIDATES) == []
+
+def test_motion_selects_only_the_moving_region():
+    previous = np.full((2160, 3840, 3), 128, dtype=np.uint8)
+    frame = previous.copy()
+    # Someone walks into the top-right corner
+    frame[100:300, 3500:3700] = 30
+    tiles = tile_grid(frame.shape)
+
+    chosen = select_tiles(tiles, tile_activity(frame, tiles, previous), NO_CANDIDATES)
+    assert chosen
+    assert all(x1 <= 3500 and 3700 <= x2 and y1 <= 100 and 300 <= y2 for x1, y1, x2, y2 in chosen)
+
+def test_candidate_tile_runs_on_a_static_frame():
+    frame = np.full((2160, 3840, 3), 128, dtype=np.uint8)
+    tiles = tile_grid(frame.shape)
+    candidates = np.array([[1000, 1000, 1020, 1024, 0.1]], dtype=np.float32)
+
+    chosen = select_tiles(tiles, tile_activity(frame, tiles, frame), candidates)
+    assert len(chosen) == 1
+    x1, y1, x2, y2 = chosen[0]
+    assert x1 <= 1000 and y1 <= 1000 and 1020 <= x2 and 1024 <= y2
@@ -0,0 +1,33 @@
+import os
+import numpy as np
+import pytest
+from config import LEGACY_MODEL_VERSION
+from vector_store import VectorStore, ShardedVectorStore, shard_path
+
+DIM = 8
+
+def test_index_without_metadata_is_treated_as_legacy(tmp_path):
+    index_path = str(tmp_path / "index.bin")
+    store = VectorStore(DIM, index_path, model_version=LEGACY_MODEL_VERSION)
+    store.add_embedding(np.ones(DIM, dtype=np.float32), 1)
+    store.save_index()
+    os.remove(f"{index_path}.meta.json")
+
+    legacy = VectorStore(DIM, index_path, model_version=LEGACY_MODEL_VERSION)
+    assert not legacy.version_mismatch
+
+    upgraded = VectorStore(DIM, index_path, model_version="yolov8n-face+vggface2+rgb")
+    assert upgraded.version_mismatch
+    assert upgraded.model_version == LEGACY_MODEL_VERSION
+    assert not upgraded.add_embedding(np.ones(DIM, dtype=np.float32), 2)
+    assert upgraded.contains(1) and not upgraded.contains(2)
+
+def test_sharding_an_existing_gallery_requires_migration(tmp_path):
+    index_path = str(tmp_path / "index.bin")
+    store = VectorStore(DIM, index_path, model_version=LEGACY_MODEL_VERSION)
+    store.add_embedding(np.ones(DIM, dtype=np.float32), 1)
+    store.save_index()
+
+    with pytest.raises(RuntimeError, match="migrate.py"):
+        ShardedVectorStore(num_shards=2, embedding_dim=DIM, base_path=index_path)
+    assert not os.path.exists(shard_path(index_path, 0))
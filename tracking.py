@@ -0,0 +1,74 @@
+from config import TRACKER_MIN_IOU, TRACKER_MAX_AGE
+
+def box_iou(box_a, box_b):
+    """
+    Intersection over union of two xyxy boxes
+    """
+    x1 = max(box_a[0], box_b[0])
+    y1 = max(box_a[1], box_b[1])
+    x2 = min(box_a[2], box_b[2])
+    y2 = min(box_a[3], box_b[3])
+
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    union = area_a + area_b - intersection
+
+    return intersection / union if union > 0 else 0.0
+
+class IouTracker:
+    def __init__(self, min_iou=TRACKER_MIN_IOU, max_age=TRACKER_MAX_AGE):
+        """
+        Greedy IoU tracker assigning stable IDs to face boxes across sampled frames
+
+        Args:
+            min_iou (float): Minimum IoU to continue a track
+            max_age (int): Updates a track survives without a matching box
+        """
+        self.min_iou = min_iou
+        self.max_age = max_age
+        self.tracks = {}
+        self.next_id = 1
+
+    def update(self, boxes):
+        """
+        Match boxes to existing tracks and start new tracks for the rest
+
+        Args:
+            boxes (list): Boxes (x1, y1, x2, y2) found on the current frame
+
+        Returns:
+            list: Track ID for each box, in input order
+        """
+        pairs = sorted(
+            (
+                (box_iou(box, track["bbox"]), box_index, track_id)
+                for box_index, box in enumerate(boxes)
+                for track_id, track in self.tracks.items()
+            ),
+            reverse=True
+        )
+
+        assigned = [None] * len(boxes)
+        used_tracks = set()
+        for iou, box_index, track_id in pairs:
+            if iou < self.min_iou:
+                break
+            if assigned[box_index] is None and track_id not in used_tracks:
+                assigned[box_index] = track_id
+                used_tracks.add(track_id)
+
+        for box_index, box in enumerate(boxes):
+            if assigned[box_index] is None:
+                assigned[box_index] = self.next_id
+                self.next_id += 1
+            self.tracks[assigned[box_index]] = {"bbox": box, "age": 0}
+
+        # Age out tracks that were not seen on this frame
+        for track_id in list(self.tracks):
+            if track_id not in assigned:
+                self.tracks[track_id]["age"] += 1
+                if self.tracks[track_id]["age"] > self.max_age:
+                    del self.tracks[track_id]
+
+        return assigned
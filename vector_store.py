@@ -1,56 +1,263 @@
 import faiss
 import numpy as np
 import os
-from config import FAISS_INDEX_PATH
+import heapq
+import json
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    FAISS_INDEX_PATH,
+    FAISS_NUM_SHARDS,
+    FAISS_SHARD_STRATEGY,
+    FAISS_MMAP,
+    JOURNAL_SNAPSHOT_INTERVAL,
+    GALLERY_MAX_EMBEDDINGS,
+    MODEL_VERSION,
+    LEGACY_MODEL_VERSION
+)
+from journal import EmbeddingJournal, OP_ADD
 import logging
-from database import search_open_cases
+
+# Read-only memory-mapped loading. IO_FLAG_MMAP alone only maps IVF inverted lists;
+# IO_FLAG_MMAP_IFC (FAISS >= 1.11) also maps the codes of flat indexes like ours
+MMAP_IO_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_MMAP_IFC
+
+# Extra gallery embeddings of a child are stored under (slot << 32) | embedding_id;
+# slot 0 is the plain embedding ID, so single-embedding galleries are unchanged
+GALLERY_SLOT_SHIFT = 32
+GALLERY_ID_MASK = (1 << GALLERY_SLOT_SHIFT) - 1
+
+def gallery_vector_ids(embedding_id, count):
+    """
+    Vector IDs for the first `count` gallery slots of a child
+    """
+    return [(slot << GALLERY_SLOT_SHIFT) | int(embedding_id) for slot in range(count)]
+
+def child_embedding_id(vector_id):
+    """
+    Child embedding ID that a stored vector belongs to
+    """
+    return int(vector_id) & GALLERY_ID_MASK
+
+def collapse_by_child(results, top_k):
+    """
+    Keep the best-scoring hit per child from (similarity, vector_id) pairs, best first
+    """
+    best = {}
+    for similarity, vector_id in results:
+        embedding_id = child_embedding_id(vector_id)
+        if similarity > best.get(embedding_id, -1.0):
+            best[embedding_id] = similarity
+    return heapq.nlargest(top_k, ((similarity, embedding_id) for embedding_id, similarity in best.items()))
+
+def read_index_metadata(index_path):
+    """
+    Read the sidecar metadata (model version, embedding dimension) of an index file
+    
+    Returns:
+        dict: Metadata, empty for indexes created before metadata was recorded
+        (their model version is LEGACY_MODEL_VERSION)
+    """
+    try:
+        with open(f"{index_path}.meta.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_index_metadata(index_path, model_version, embedding_dim):
+    """
+    Atomically record the model version an index was built with
+    """
+    meta_path = f"{index_path}.meta.json"
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"model_version": model_version, "embedding_dim": embedding_dim}, f)
+    os.replace(tmp_path, meta_path)
 
 class VectorStore:
-    def __init__(self, embedding_dim=512):
+    def __init__(self, embedding_dim=512, index_path=FAISS_INDEX_PATH, mmap=False, model_version=MODEL_VERSION):
         """
         Initialize FAISS vector store with comprehensive error handling
+
+        Args:
+            embedding_dim (int): Embedding dimension
+            index_path (str): Path to the FAISS index file
+            mmap (bool): Open an existing index memory-mapped and read-only; the page
+                cache is then shared by every process on the host. Journal records are
+                kept in a small in-memory overlay, and the index is reloaded into RAM
+                on the first add or remove.
+            model_version (str): Model version recorded when a new index is created
+
+        Mutations are appended to a write-ahead journal next to the index file and
+        folded into a new snapshot every JOURNAL_SNAPSHOT_INTERVAL operations. Several
+        processes can share an index: mutations and snapshots hold the journal lock
+        and first catch up with what other processes have written.
         """
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         
         # Ensure a consistent index type
         self.embedding_dim = embedding_dim
+        self.index_path = index_path
+        self.mmap = mmap
+        self.read_only = False
         self.index = None
+        # Journal state layered over a read-only snapshot: vectors added since the
+        # snapshot, and snapshot IDs that were removed or replaced
+        self.overlay = None
+        self.masked_ids = set()
+        self.journal = EmbeddingJournal(f"{index_path}.journal", embedding_dim)
+        self.journal_offset = 0
+        self.snapshot_stamp = None
+        self.pending_mutations = 0
+        self.model_version = model_version
+        self.version_mismatch = False
         
         # Initialize the index
         self.create_or_load_index()
 
     def create_or_load_index(self):
         """
-        Create a new index or load an existing one
+        Create a new index or load the latest snapshot, then replay the journal
         """
-        try:
+        with self.journal.lock():
             # Create a new index if file doesn't exist
-            if not os.path.exists(FAISS_INDEX_PATH):
+            if not os.path.exists(self.index_path):
                 self.logger.info("Creating new FAISS index")
                 # Use IndexFlatL2 for Euclidean distance (better for facial embeddings)
                 base_index = faiss.IndexFlatL2(self.embedding_dim)
                 self.index = faiss.IndexIDMap(base_index)
+                self._catch_up(truncate=True)
+                write_index_metadata(self.index_path, self.model_version, self.embedding_dim)
                 self.save_index()
-            else:
-                # Load existing index
-                self.logger.info("Loading existing FAISS index")
-                self.index = faiss.read_index(FAISS_INDEX_PATH)
-                
-                # Verify index
-                self.logger.info(f"Loaded index dimension: {self.index.d}")
-                self.logger.info(f"Total vectors in index: {self.index.ntotal}")
+                return
+            
+            try:
+                self._load_snapshot(self.mmap)
+            except Exception as e:
+                # Never fall back to an empty index: the next snapshot would overwrite the gallery
+                self.logger.error(f"Error loading index: {e}")
+                raise RuntimeError(f"FAISS index at {self.index_path} could not be loaded") from e
+            
+            self._catch_up()
         
-        except Exception as e:
-            self.logger.error(f"Error creating/loading index: {e}")
-            # Fallback to creating a new index
-            base_index = faiss.IndexFlatL2(self.embedding_dim)
-            self.index = faiss.IndexIDMap(base_index)
+        # Embeddings from a different model are not comparable with current queries
+        index_version = read_index_metadata(self.index_path).get("model_version", LEGACY_MODEL_VERSION)
+        self.version_mismatch = index_version != self.model_version
+        if self.version_mismatch:
+            self.logger.warning(
+                f"Index {self.index_path} was built with {index_version} but current models are "
+                f"{self.model_version}; searches are unreliable and adds are refused until "
+                f"migrate.py re-embeds the gallery"
+            )
+        self.model_version = index_version
+        
+        # Verify index
+        self.logger.info(f"Loaded index dimension: {self.index.d}")
+        self.logger.info(f"Total vectors in index: {self.index.ntotal}")
+
+    def _snapshot_file_stamp(self):
+        """
+        Identity of the snapshot file on disk; a new snapshot is a new file
+        """
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _load_snapshot(self, mmap):
+        """
+        Load the snapshot memory-mapped (with an empty overlay) or fully into RAM
+        """
+        self.snapshot_stamp = self._snapshot_file_stamp()
+        if mmap:
+            self.logger.info("Memory-mapping existing FAISS index")
+            self.index = faiss.read_index(self.index_path, MMAP_IO_FLAGS)
+            self.overlay = faiss.IndexIDMap(faiss.IndexFlatL2(self.embedding_dim))
+            self.read_only = True
+        else:
+            self.logger.info("Loading existing FAISS index")
+            self.index = faiss.read_index(self.index_path)
+            self.overlay = None
+            self.read_only = False
+        self.masked_ids = set()
+        self.journal_offset = 0
+        self.pending_mutations = 0
+
+    def _catch_up(self, truncate=False):
+        """
+        Apply journal records written since this process last looked
+
+        Called with the journal lock held. If another process wrote a new snapshot
+        in the meantime, that snapshot is loaded first.
+
+        Args:
+            truncate (bool): Cut off a torn tail record; only writers pass True
+        """
+        if self.snapshot_stamp != self._snapshot_file_stamp():
+            self._load_snapshot(self.read_only)
+        
+        records, end = self.journal.replay(self.journal_offset)
+        if truncate:
+            self.journal.truncate(end)
+        self._apply_journal(records)
+        self.journal_offset = end
+
+    def _apply_journal(self, records):
+        """
+        Replay journal records on top of the loaded snapshot
+        
+        Only the last operation per ID matters, and every touched ID is removed
+        before re-adding, so replaying records already in the snapshot is harmless.
+        On a read-only snapshot the records go to the overlay instead.
+        """
+        if not records:
+            return
+        
+        final_state = {}
+        for op, embedding_id, vector in records:
+            final_state[embedding_id] = vector if op == OP_ADD else None
+        
+        target = self.index
+        if self.read_only:
+            self.masked_ids.update(final_state)
+            target = self.overlay
+        target.remove_ids(np.array(list(final_state), dtype=np.int64))
+        
+        added = [(embedding_id, vector) for embedding_id, vector in final_state.items() if vector is not None]
+        if added:
+            ids, vectors = zip(*added)
+            target.add_with_ids(np.stack(vectors), np.array(ids, dtype=np.int64))
+        
+        self.pending_mutations += len(records)
+        self.logger.info(f"Replayed {len(records)} journal records from {self.journal.path}")
+
+    def _after_mutation(self):
+        """
+        Snapshot the index once enough journal records have accumulated
+        """
+        if self.pending_mutations >= JOURNAL_SNAPSHOT_INTERVAL:
+            self.save_index()
+
+    def _ensure_writable(self):
+        """
+        Replace a memory-mapped read-only index (and its overlay) with a fully loaded one
+        
+        Called with the journal lock held; the journal is replayed again by _catch_up.
+        """
+        if self.read_only:
+            self.logger.info("Reloading memory-mapped index for modification")
+            self._load_snapshot(mmap=False)
 
     def add_embedding(self, embedding, embedding_id):
         """
         Add embedding to vector store with comprehensive checks
         """
+        if self.version_mismatch:
+            self.logger.error(f"Refusing to add embedding {embedding_id} to an index built with {self.model_version}")
+            return False
+        
         try:
             # Ensure embedding is correct shape and type
             embedding = np.array([embedding], dtype=np.float32)
@@ -64,11 +271,15 @@ class VectorStore:
             # Normalize embedding for better similarity search
             embedding = embedding / np.linalg.norm(embedding, axis=1)[:, np.newaxis]
             
-            # Add embedding
-            self.index.add_with_ids(embedding, embedding_id)
-            
-            # Save updated index
-            self.save_index()
+            with self.journal.lock():
+                self._ensure_writable()
+                self._catch_up(truncate=True)
+                
+                # Journal first, then apply in memory
+                self.journal_offset = self.journal.append_add(embedding_id[0], embedding[0])
+                self.index.add_with_ids(embedding, embedding_id)
+                self.pending_mutations += 1
+                self._after_mutation()
             
             self.logger.info(f"Added embedding with ID {embedding_id[0]}")
             return True
@@ -77,32 +288,114 @@ class VectorStore:
             self.logger.error(f"Error adding embedding: {e}")
             return False
 
+    def _stored_vector_ids(self):
+        """
+        IDs of every stored vector, including the overlay of a read-only index
+        """
+        stored_ids = faiss.vector_to_array(self.index.id_map)
+        if self.read_only:
+            stored_ids = stored_ids[~np.isin(stored_ids, list(self.masked_ids))]
+            stored_ids = np.concatenate([stored_ids, faiss.vector_to_array(self.overlay.id_map)])
+        return stored_ids
+
+    def _child_vector_ids(self, embedding_id):
+        """
+        All stored vector IDs belonging to a child's gallery
+        """
+        stored_ids = self._stored_vector_ids()
+        return stored_ids[(stored_ids & GALLERY_ID_MASK) == int(embedding_id)]
+
+    def stored_child_ids(self):
+        """
+        Embedding IDs of every child with at least one stored vector
+        """
+        return {child_embedding_id(vector_id) for vector_id in self._stored_vector_ids()}
+
+    def remove_vectors(self, vector_ids):
+        """
+        Remove specific stored vectors, e.g. some gallery slots of a child
+        
+        Returns:
+            int: Number of vectors removed
+        """
+        vector_ids = np.asarray(vector_ids, dtype=np.int64)
+        with self.journal.lock():
+            self._ensure_writable()
+            self._catch_up(truncate=True)
+            
+            # Journal first, then apply in memory
+            for vector_id in vector_ids:
+                self.journal_offset = self.journal.append_remove(vector_id)
+            removed = self.index.remove_ids(vector_ids)
+            self.pending_mutations += len(vector_ids)
+            self._after_mutation()
+        return removed
+
+    def remove_embedding(self, embedding_id):
+        """
+        Remove a child's embeddings (every gallery slot) from the vector store
+        """
+        try:
+            with self.journal.lock():
+                self._ensure_writable()
+                self._catch_up(truncate=True)
+                removed = self.remove_vectors(self._child_vector_ids(embedding_id))
+            
+            self.logger.info(f"Removed {removed} embeddings of {embedding_id} from FAISS index")
+            return removed > 0
+        
+        except Exception as e:
+            self.logger.error(f"Error removing embedding: {e}")
+            return False
+
+    def contains(self, embedding_id):
+        """
+        Check whether any embedding of a child is stored in this index
+        """
+        return len(self._child_vector_ids(embedding_id)) > 0
+
+    def search_with_scores(self, embedding, top_k=5):
+        """
+        Search the index and return (similarity, embedding_id) pairs, best first
+        
+        Hits are collapsed per child, keeping the best score, so a child with several
+        gallery embeddings occupies a single result.
+        """
+        # Normalize query embedding
+        embedding = np.array([embedding], dtype=np.float32)
+        embedding = embedding / np.linalg.norm(embedding, axis=1)[:, np.newaxis]
+        
+        # Perform search, over-fetching so collapsing still yields top_k children
+        fetch = top_k * GALLERY_MAX_EMBEDDINGS
+        D, I = self.index.search(embedding, fetch + len(self.masked_ids))
+        hits = [(dist, idx) for dist, idx in zip(D[0], I[0]) if idx not in self.masked_ids]
+        if self.overlay is not None and self.overlay.ntotal:
+            D, I = self.overlay.search(embedding, fetch)
+            hits.extend(zip(D[0], I[0]))
+        
+        # Detailed logging of search results
+        self.logger.info("Search Results:")
+        results = []
+        for dist, idx in hits:
+            # Convert distance to similarity (for L2 distance)
+            similarity = 1 / (1 + dist)
+            self.logger.info(f"Embedding ID: {idx}, Distance: {dist}, Similarity: {similarity}")
+            if idx != -1:
+                results.append((float(similarity), int(idx)))
+        
+        return collapse_by_child(results, top_k)
+
     def search_embeddings(self, embedding, top_k=5, similarity_threshold=0.7):
         """
         Enhanced search with improved similarity calculation
         """
         try:
-            # Normalize query embedding
-            embedding = np.array([embedding], dtype=np.float32)
-            embedding = embedding / np.linalg.norm(embedding, axis=1)[:, np.newaxis]
-            
-            # Perform search
-            D, I = self.index.search(embedding, top_k)
-            
-            # Detailed logging of search results
-            self.logger.info("Search Results:")
-            for dist, idx in zip(D[0], I[0]):
-                # Convert distance to similarity (for L2 distance)
-                similarity = 1 / (1 + dist)
-                self.logger.info(f"Embedding ID: {idx}, Distance: {dist}, Similarity: {similarity}")
-            
             # Filter matches based on similarity
-            matches = []
-            for sim, embedding_id in zip(D[0], I[0]):
-                # Convert distance to similarity
-                similarity = 1 / (1 + sim)
-                if similarity > similarity_threshold and embedding_id != -1:
-                    matches.append(embedding_id)
+            matches = [
+                embedding_id
+                for similarity, embedding_id in self.search_with_scores(embedding, top_k)
+                if similarity > similarity_threshold
+            ]
             
             # Return matches or -1 if no matches
             return matches if matches else [-1]
@@ -111,39 +404,247 @@ class VectorStore:
             self.logger.error(f"Error searching embeddings: {e}")
             return [-1]
 
-    def save_index(self, filename=FAISS_INDEX_PATH):
+    def save_index(self):
         """
-        Save FAISS index with robust error handling
+        Write a compacted snapshot of the FAISS index
+        
+        The snapshot is written to a temporary file and atomically renamed, so a
+        crash leaves either the previous or the new snapshot, never a partial one.
+        Records other processes appended are applied first, and the journal is
+        only emptied once the new snapshot is in place.
         """
         try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with self.journal.lock():
+                self._ensure_writable()
+                self._catch_up(truncate=True)
+                
+                # Ensure directory exists
+                os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+                
+                # Save index
+                tmp_filename = f"{self.index_path}.tmp"
+                faiss.write_index(self.index, tmp_filename)
+                with open(tmp_filename, "rb") as f:
+                    os.fsync(f.fileno())
+                os.replace(tmp_filename, self.index_path)
+                
+                self.journal.reset()
+                self.journal_offset = 0
+                self.snapshot_stamp = self._snapshot_file_stamp()
+                self.pending_mutations = 0
             
-            # Save index
-            faiss.write_index(self.index, filename)
-            self.logger.info(f"Index saved to {filename}")
+            self.logger.info(f"Index saved to {self.index_path}")
+            return True
         except Exception as e:
             self.logger.error(f"Error saving index: {e}")
+            return False
+
+def shard_path(base_path, shard):
+    """
+    Index file path for one shard, e.g. faiss_index.shard0.bin
+    """
+    root, ext = os.path.splitext(base_path)
+    return f"{root}.shard{shard}{ext}"
+
+class ShardedVectorStore:
+    def __init__(
+        self,
+        num_shards=FAISS_NUM_SHARDS,
+        strategy=FAISS_SHARD_STRATEGY,
+        embedding_dim=512,
+        base_path=FAISS_INDEX_PATH,
+        mmap=False,
+        model_version=MODEL_VERSION
+    ):
+        """
+        Vector store partitioned across several FAISS index files
+        
+        Args:
+            num_shards (int): Number of index shards
+            strategy (str): 'id' routes by embedding ID, 'region' by last known location
+            embedding_dim (int): Embedding dimension
+            base_path (str): Path the shard file names are derived from
+            mmap (bool): Open shard indexes memory-mapped and read-only
+            model_version (str): Model version recorded when new shards are created
+        
+        Raises:
+            RuntimeError: If an unsharded gallery exists at base_path but no shards do;
+                opening would create empty shards and every registered child would
+                silently stop matching
+        """
+        shard_paths = [shard_path(base_path, shard) for shard in range(num_shards)]
+        if os.path.exists(base_path) and not any(os.path.exists(path) for path in shard_paths):
+            raise RuntimeError(
+                f"{base_path} holds an unsharded gallery but its {num_shards} shards do not exist; "
+                f"run 'FAISS_NUM_SHARDS={num_shards} python migrate.py' to build them from the stored photos"
+            )
+        
+        self.logger = logging.getLogger(__name__)
+        self.num_shards = num_shards
+        self.strategy = strategy
+        self.shards = [
+            VectorStore(embedding_dim, path, mmap=mmap, model_version=model_version)
+            for path in shard_paths
+        ]
+        
+        # FAISS releases the GIL during search, so threads search shards in parallel
+        self.executor = ThreadPoolExecutor(max_workers=num_shards)
+
+    def shard_for(self, embedding_id, region=None):
+        """
+        Owning shard index for an embedding
+        
+        Region routing falls back to the embedding ID when no region is known,
+        so adds and removes route the same way for the same metadata.
+        """
+        if self.strategy == 'region' and region:
+            # crc32 is stable across processes, unlike hash() on strings
+            return zlib.crc32(region.strip().lower().encode("utf-8")) % self.num_shards
+        # Route on the child ID so every gallery slot of a child shares a shard
+        return child_embedding_id(embedding_id) % self.num_shards
+
+    def add_embedding(self, embedding, embedding_id, region=None):
+        """
+        Add embedding to its owning shard only
+        """
+        return self.shards[self.shard_for(embedding_id, region)].add_embedding(embedding, embedding_id)
+
+    def save_index(self):
+        """
+        Snapshot every shard
+        """
+        return all([shard.save_index() for shard in self.shards])
+
+    def remove_embedding(self, embedding_id, region=None):
+        """
+        Remove embedding from its owning shard only
+        """
+        shard = self.shards[self.shard_for(embedding_id, region)]
+        
+        if self.strategy == 'region' and not shard.contains(embedding_id):
+            # Location may have changed since registration; find the actual owner
+            owners = [s for s in self.shards if s.contains(embedding_id)]
+            if not owners:
+                self.logger.warning(f"Embedding {embedding_id} not found in any shard")
+                return False
+            shard = owners[0]
+        
+        return shard.remove_embedding(embedding_id)
+
+    def stored_child_ids(self):
+        """
+        Embedding IDs of every child stored in any shard
+        """
+        return set().union(*(shard.stored_child_ids() for shard in self.shards))
+
+    def remove_vectors(self, vector_ids, region=None):
+        """
+        Remove specific vectors of one child from its owning shard
+        """
+        if len(vector_ids) == 0:
+            return 0
+        return self.shards[self.shard_for(vector_ids[0], region)].remove_vectors(vector_ids)
+
+    def search_with_scores(self, embedding, top_k=5):
+        """
+        Scatter the query to all shards and merge the per-shard top-k with a heap
+        """
+        futures = [
+            self.executor.submit(shard.search_with_scores, embedding, top_k)
+            for shard in self.shards
+        ]
+        
+        shard_results = [future.result() for future in futures]
+        return collapse_by_child((result for results in shard_results for result in results), top_k)
+
+    def search_embeddings(self, embedding, top_k=5, similarity_threshold=0.7):
+        """
+        Search all shards and return matching embedding IDs
+        """
+        try:
+            matches = [
+                embedding_id
+                for similarity, embedding_id in self.search_with_scores(embedding, top_k)
+                if similarity > similarity_threshold
+            ]
+            
+            return matches if matches else [-1]
+        
+        except Exception as e:
+            self.logger.error(f"Error searching embeddings: {e}")
+            return [-1]
+
+def get_vector_store(mmap=False):
+    """
+    Create the configured vector store (sharded when FAISS_NUM_SHARDS > 1)
+    """
+    if FAISS_NUM_SHARDS > 1:
+        return ShardedVectorStore(mmap=mmap)
+    return VectorStore(mmap=mmap)
 
 # Utility functions
-def add_embedding_to_faiss(embedding, embedding_id):
+def add_embedding_to_faiss(embedding, embedding_id, region=None):
     """
     Convenience function to add embedding with error handling
     """
     try:
-        vector_store = VectorStore()
+        vector_store = get_vector_store()
+        if isinstance(vector_store, ShardedVectorStore):
+            return vector_store.add_embedding(embedding, embedding_id, region)
         return vector_store.add_embedding(embedding, embedding_id)
     except Exception as e:
         logging.error(f"Error adding embedding: {e}")
         return False
 
+def add_gallery_to_faiss(embeddings, embedding_id, region=None):
+    """
+    Convenience function to store a child's gallery embeddings under one embedding ID
+    
+    Either every embedding is stored or none: slots added before a failure are removed again.
+    """
+    try:
+        vector_store = get_vector_store()
+        sharded = isinstance(vector_store, ShardedVectorStore)
+        added = []
+        for vector_id, embedding in zip(gallery_vector_ids(embedding_id, len(embeddings)), embeddings):
+            if sharded:
+                stored = vector_store.add_embedding(embedding, vector_id, region)
+            else:
+                stored = vector_store.add_embedding(embedding, vector_id)
+            if not stored:
+                if added:
+                    logging.warning(f"Rolling back {len(added)} gallery embeddings of {embedding_id}")
+                    if sharded:
+                        vector_store.remove_vectors(added, region)
+                    else:
+                        vector_store.remove_vectors(added)
+                return False
+            added.append(vector_id)
+        return True
+    except Exception as e:
+        logging.error(f"Error adding gallery embeddings: {e}")
+        return False
+
+def remove_embedding_from_faiss(embedding_id, region=None):
+    """
+    Convenience function to remove embedding with error handling
+    """
+    try:
+        vector_store = get_vector_store()
+        if isinstance(vector_store, ShardedVectorStore):
+            return vector_store.remove_embedding(embedding_id, region)
+        return vector_store.remove_embedding(embedding_id)
+    except Exception as e:
+        logging.error(f"Error removing embedding: {e}")
+        return False
+
 def search_faiss(embedding, top_k=5, similarity_threshold=0.7):
     """
     Convenience function to search embeddings
     """
     try:
-        vector_store = VectorStore()
+        vector_store = get_vector_store(mmap=FAISS_MMAP)
         return vector_store.search_embeddings(embedding, top_k, similarity_threshold)
     except Exception as e:
         logging.error(f"Error searching embeddings: {e}")
-        return [-1]
\ No newline at end of file
+        return [-1]
@@ -0,0 +1,240 @@
+import queue
+import logging
+import threading
+from collections import defaultdict, deque
+import cv2
+from config import (
+    VIDEO_WRITER_QUEUE_SIZE,
+    VIDEO_SEGMENT_PRE_ROLL,
+    VIDEO_SEGMENT_POST_ROLL,
+    VIDEO_ANNOTATION_HOLD
+)
+from tracking import IouTracker
+
+class AsyncVideoWriter:
+    def __init__(self, output_path, fps, frame_size, queue_size=VIDEO_WRITER_QUEUE_SIZE, fourcc="mp4v"):
+        """
+        cv2.VideoWriter running on a dedicated encoder thread fed by a bounded queue
+
+        Args:
+            output_path (str): Output video path
+            fps (float): Output frame rate
+            frame_size (tuple): (width, height) of the frames
+            queue_size (int): Maximum frames waiting for the encoder
+            fourcc (str): Codec code for cv2.VideoWriter
+        """
+        self.output_path = output_path
+        self.writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, frame_size)
+        if not self.writer.isOpened():
+            raise IOError(f"Could not open video writer for {output_path}")
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._encode_loop, daemon=True)
+        self._thread.start()
+
+    def _encode_loop(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            self.writer.write(frame)
+            self.frames_written += 1
+
+    def write(self, frame, block=False):
+        """
+        Hand a frame to the encoder thread
+
+        Args:
+            frame (numpy.ndarray): BGR frame
+            block (bool): Wait for queue space instead of dropping the frame
+
+        Returns:
+            bool: True if the frame was queued
+        """
+        try:
+            self._queue.put(frame, block=block)
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+
+    def close(self):
+        """
+        Drain the queue, stop the encoder thread and finalize the file
+        """
+        self._queue.put(None)
+        self._thread.join()
+        self.writer.release()
+        logging.info(
+            f"Output video {self.output_path}: {self.frames_written} frames written, "
+            f"{self.frames_dropped} dropped"
+        )
+
+def annotate_frame(frame, detections):
+    """
+    Draw boxes, track IDs and matched embedding IDs on a copy of a frame
+
+    Args:
+        frame (numpy.ndarray): BGR frame
+        detections (list): Dicts with 'bbox' and optional 'track_id' and 'matches'
+
+    Returns:
+        numpy.ndarray: Annotated frame
+    """
+    annotated = frame.copy()
+
+    for detection in detections:
+        x1, y1, x2, y2 = detection["bbox"]
+        matches = detection.get("matches") or []
+        color = (0, 0, 255) if matches else (0, 255, 0)
+
+        label = f"T{detection['track_id']}" if detection.get("track_id") is not None else ""
+        if matches:
+            label += " Child " + ",".join(str(m) for m in matches)
+
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
+        if label:
+            cv2.putText(annotated, label.strip(), (x1, max(0, y1 - 8)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+    return annotated
+
+class AnnotatedVideoRenderer:
+    def __init__(
+        self,
+        output_path,
+        fps,
+        frame_size,
+        segments_only=False,
+        block=True,
+        pre_roll=VIDEO_SEGMENT_PRE_ROLL,
+        post_roll=VIDEO_SEGMENT_POST_ROLL
+    ):
+        """
+        Annotate frames and write them, optionally only around matches
+
+        Args:
+            output_path (str): Output video path
+            fps (float): Frame rate
+            frame_size (tuple): (width, height) of the frames
+            segments_only (bool): Only write pre_roll/post_roll seconds around matches
+            block (bool): Wait for the encoder when its queue is full; live sources
+                pass False so encoding can never stall detection
+            pre_roll (float): Seconds written before a match
+            post_roll (float): Seconds written after a match
+        """
+        self.writer = AsyncVideoWriter(output_path, fps, frame_size)
+        self.segments_only = segments_only
+        self.block = block
+        self.post_roll = post_roll
+        self.pre_roll_frames = deque(maxlen=max(1, int(pre_roll * fps)))
+        self.active_until = None
+        self.last_annotated = None
+        self.last_timestamp = None
+
+    def add_frame(self, frame, detections, timestamp, hold=0):
+        """
+        Annotate one frame and write it if it falls in an output segment
+
+        Args:
+            hold (int): Source frames skipped since the previous call; the previous
+                annotated frame is repeated for them so playback keeps the source timing
+        """
+        if self.last_annotated is not None:
+            for _ in range(hold):
+                self._emit(self.last_annotated, self.last_timestamp)
+
+        annotated = annotate_frame(frame, detections)
+
+        if self.segments_only and any(d.get("matches") for d in detections):
+            # Open (or extend) a segment, including the buffered lead-in
+            while self.pre_roll_frames:
+                self.writer.write(self.pre_roll_frames.popleft(), block=self.block)
+            self.active_until = timestamp + self.post_roll
+
+        self._emit(annotated, timestamp)
+        self.last_annotated = annotated
+        self.last_timestamp = timestamp
+
+    def _emit(self, annotated, timestamp):
+        if not self.segments_only or (self.active_until is not None and timestamp <= self.active_until):
+            self.writer.write(annotated, block=self.block)
+        else:
+            self.pre_roll_frames.append(annotated)
+
+    def close(self):
+        self.writer.close()
+
+def render_annotated_video(input_path, output_path, records, segments_only=False):
+    """
+    Write an annotated copy of a video from its detection records
+
+    This is a second pass run after detection has finished: the whole video is
+    decoded again and annotated on the calling thread, and the writer thread only
+    overlaps encoding with that decode, so it costs a full extra decode and encode.
+    Callers that do not need the copy skip it (identify --no-video). Detections
+    stay drawn until the next sampled frame or for VIDEO_ANNOTATION_HOLD seconds,
+    and track IDs are assigned across sampled frames.
+
+    Args:
+        input_path (str): Source video
+        output_path (str): Annotated output video
+        records (list): Detection records with 'frame_idx', 'bbox' and optional 'matches'
+        segments_only (bool): Only write footage around matches
+
+    Returns:
+        bool: True if the annotated video was written
+    """
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        logging.error(f"Could not open video file: {input_path}")
+        return False
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    detections_by_frame = defaultdict(list)
+    for record in records:
+        if "frame_idx" in record:
+            detections_by_frame[record["frame_idx"]].append(record)
+
+    try:
+        renderer = AnnotatedVideoRenderer(output_path, fps, frame_size, segments_only=segments_only)
+    except IOError as e:
+        # e.g. evidence on a read-only mount; the caller has already reported its matches
+        logging.error(f"Annotated video not written: {e}")
+        cap.release()
+        return False
+
+    tracker = IouTracker()
+    current = []
+    current_time = None
+    frame_idx = 0
+
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            timestamp = frame_idx / fps
+            if frame_idx in detections_by_frame:
+                frame_detections = detections_by_frame[frame_idx]
+                track_ids = tracker.update([d["bbox"] for d in frame_detections])
+                current = [
+                    {"bbox": d["bbox"], "track_id": track_id, "matches": d.get("matches")}
+                    for d, track_id in zip(frame_detections, track_ids)
+                ]
+                current_time = timestamp
+            elif current_time is not None and timestamp - current_time > VIDEO_ANNOTATION_HOLD:
+                current = []
+
+            renderer.add_frame(frame, current, timestamp)
+            frame_idx += 1
+    finally:
+        cap.release()
+        renderer.close()
+
+    logging.info(f"Annotated video saved to {output_path}")
+    return True
@@ -0,0 +1,39 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+def _init_worker(threads_per_worker, initializer, initargs):
+    """
+    Limit a worker's threads to its share of the cores, then load its models
+    """
+    import cv2
+    import torch
+
+    torch.set_num_threads(threads_per_worker)
+    cv2.setNumThreads(1)
+
+    if initializer is not None:
+        initializer(*initargs)
+
+def spawn_pool(workers, initializer=None, initargs=()):
+    """
+    Process pool for CPU-bound model work
+
+    Workers are spawned rather than forked so they do not inherit the parent's
+    torch thread pools, and the cores are split evenly between them.
+
+    Args:
+        workers (int): Number of worker processes
+        initializer (callable, optional): Module-level function loading the worker's warm models
+        initargs (tuple): Arguments for the initializer
+
+    Returns:
+        ProcessPoolExecutor: The pool, to be used as a context manager
+    """
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads_per_worker, initializer, initargs)
+    )